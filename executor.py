@@ -5,28 +5,284 @@ Executes actions returned by the planner using Playwright.
 No thinking - just execution.
 """
 
+import json
 import logging
+import os
+import re
 import time
-import base64
-from typing import Dict, Any, List
+from datetime import datetime
+
+try:
+    # SIMD (AVX2/SSSE3) base64 — drop-in stdlib replacement, ~3-5x faster
+    # on the screenshot-sized payloads this module shuffles around
+    import pybase64 as base64
+except ImportError:
+    import base64
+from typing import Dict, Any, List, Optional
 from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
 
-logging.basicConfig(level=logging.INFO)
+try:
+    # Optional: pixel-diffing screenshots for token-light LLM payloads
+    from PIL import Image, ImageChops
+except ImportError:
+    Image = None
+
+# Logging configuration is the application's responsibility
 logger = logging.getLogger(__name__)
 
 
+def _css_attr_escape(value: str) -> str:
+    """Escape a value for use inside a double-quoted CSS attribute selector."""
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
 class Executor:
     """Executes actions on a page using Playwright."""
-    
-    def __init__(self, page: Page):
+
+    # Static asset types worth caching across navigations; dynamic
+    # endpoints (availability APIs etc.) are deliberately excluded
+    CACHEABLE_EXTENSIONS = (
+        ".js", ".css", ".png", ".jpg", ".jpeg", ".gif", ".svg",
+        ".woff", ".woff2"
+    )
+
+    def __init__(self, page: Page, capture_on_error: bool = True,
+                 screenshot_dir: Optional[str] = None,
+                 enable_cache: bool = False,
+                 diff_screenshots: bool = False,
+                 keyframe_interval: int = 5,
+                 fast_id_click: bool = False):
         """
         Initialize the Executor.
-        
+
         Args:
             page: Playwright Page object
+            capture_on_error: Always capture a screenshot when an action
+                fails, even if the action opted out of capture
+            screenshot_dir: When set, screenshots are streamed to JPEG
+                files in this directory and results carry the file path
+                instead of inline bytes
+            enable_cache: Serve repeat static-asset requests (JS/CSS/
+                images/fonts) from an in-process cache via route
+                interception instead of refetching them
+            diff_screenshots: Attach a cropped diff vs. the previous
+                screenshot to each result (requires Pillow; inline
+                screenshot mode only)
+            keyframe_interval: Emit a full keyframe every N screenshots
+                when diffing
+            fast_id_click: Click id/eid targets with a single CDP
+                Runtime.evaluate round-trip, skipping Playwright's
+                actionability checks
         """
         self.page = page
-    
+        self.capture_on_error = capture_on_error
+        self.screenshot_dir = screenshot_dir
+        self.diff_screenshots = diff_screenshots and Image is not None
+        self.keyframe_interval = keyframe_interval
+        self.fast_id_click = fast_id_click
+        self._screenshot_seq = 0
+        self._prev_screenshot: Optional[bytes] = None
+        self._keyframe_id = 0
+        # url -> (status, headers, body) for cached static responses
+        self._response_cache: Dict[str, tuple] = {}
+        if enable_cache:
+            self.page.route("**/*", self._route_cache_handler)
+        self._cdp = None
+        # Resolved locators keyed by (url, strategy, value, role, name);
+        # cleared whenever navigation invalidates them
+        self._locator_cache: Dict[tuple, Any] = {}
+        # ISO datetime value -> "7:00 PM" display label, for select retries
+        self._time_label_cache: Dict[str, str] = {}
+        # Action-type dispatch table; new action types can be registered
+        # here without touching execute()
+        self._dispatch = {
+            "click": self._execute_click,
+            "fill": self._execute_fill,
+            "select": self._execute_select,
+            "navigate": self._execute_navigate,
+            "scroll": self._execute_scroll,
+            "wait": self._execute_wait
+        }
+
+    def _route_cache_handler(self, route) -> None:
+        """
+        Serve repeat static-asset requests from the in-process cache.
+
+        On a miss the request is fetched once, stored, and fulfilled; on a
+        hit the response comes straight from memory with no network I/O.
+        Anything that is not a GET for a known static extension passes
+        through untouched.
+        """
+        request = route.request
+        url = request.url
+        path = url.split("?", 1)[0]
+
+        if request.method != "GET" or not path.endswith(self.CACHEABLE_EXTENSIONS):
+            route.continue_()
+            return
+
+        cached = self._response_cache.get(url)
+        if cached is not None:
+            status, headers, body = cached
+            route.fulfill(status=status, headers=headers, body=body)
+            return
+
+        try:
+            response = route.fetch()
+            body = response.body()
+            # body() is already decoded, so the stored headers must not
+            # claim the original compression (or its length) — replaying
+            # content-encoding over plain bytes makes the browser fail to
+            # decode the asset on every hit
+            headers = {k: v for k, v in response.headers.items()
+                       if k.lower() not in ("content-encoding", "content-length")}
+            self._response_cache[url] = (response.status, headers, body)
+            route.fulfill(response=response, body=body)
+        except Exception as e:
+            logger.debug("Asset cache miss passthrough for %s: %s", url, e)
+            try:
+                route.continue_()
+            except Exception:
+                pass
+
+    def _get_cdp_session(self):
+        """Lazily create (and reuse) a CDP session for fast screenshot capture."""
+        if self._cdp is None:
+            try:
+                self._cdp = self.page.context.new_cdp_session(self.page)
+            except Exception as e:
+                logger.warning("CDP session unavailable, falling back to page.screenshot: %s", e)
+                self._cdp = False
+        return self._cdp or None
+
+    def _evaluate_fast(self, expression: str) -> None:
+        """
+        Run a fire-and-forget JS expression over the shared CDP session,
+        skipping Playwright's serialization layer. Falls back to
+        page.evaluate when no CDP session is available.
+        """
+        cdp = self._get_cdp_session()
+        if cdp:
+            try:
+                cdp.send("Runtime.evaluate", {
+                    "expression": expression,
+                    "returnByValue": True
+                })
+                return
+            except Exception as e:
+                logger.warning("CDP evaluate failed, falling back: %s", e)
+        self.page.evaluate(expression)
+
+    # Full descriptors per key: without code/virtual key codes Chromium
+    # accepts the event but can't map it to its default action, so a bare
+    # {type, key} PageDown "succeeds" while scrolling nothing
+    _KEY_DESCRIPTORS = {
+        "PageDown": {"code": "PageDown", "windowsVirtualKeyCode": 34,
+                     "nativeVirtualKeyCode": 34},
+        "PageUp": {"code": "PageUp", "windowsVirtualKeyCode": 33,
+                   "nativeVirtualKeyCode": 33},
+        "End": {"code": "End", "windowsVirtualKeyCode": 35,
+                "nativeVirtualKeyCode": 35},
+        "Home": {"code": "Home", "windowsVirtualKeyCode": 36,
+                 "nativeVirtualKeyCode": 36},
+    }
+
+    def _press_key_fast(self, key: str) -> None:
+        """Dispatch a key press over the shared CDP session, with fallback.
+
+        Keys without a prepared descriptor go through keyboard.press,
+        which knows the full keyboard layout.
+        """
+        descriptor = self._KEY_DESCRIPTORS.get(key)
+        cdp = self._get_cdp_session()
+        if cdp and descriptor:
+            try:
+                cdp.send("Input.dispatchKeyEvent",
+                         {"type": "rawKeyDown", "key": key, **descriptor})
+                cdp.send("Input.dispatchKeyEvent",
+                         {"type": "keyUp", "key": key, **descriptor})
+                return
+            except Exception as e:
+                logger.warning("CDP key dispatch failed, falling back: %s", e)
+        self.page.keyboard.press(key)
+
+    def _capture_screenshot(self) -> bytes:
+        """
+        Capture a screenshot and return it as raw JPEG bytes.
+
+        Uses CDP Page.captureScreenshot (JPEG, optimizeForSpeed) which is
+        much faster than the default PNG path. Falls back to
+        page.screenshot when no CDP session is available (non-Chromium).
+        """
+        cdp = self._get_cdp_session()
+        if cdp:
+            try:
+                result = cdp.send("Page.captureScreenshot", {
+                    "format": "jpeg",
+                    "quality": 75,
+                    "optimizeForSpeed": True
+                })
+                return base64.b64decode(result["data"])
+            except Exception as e:
+                logger.warning("CDP screenshot failed, falling back: %s", e)
+
+        return self.page.screenshot(type="jpeg", quality=75)
+
+    def _take_screenshot(self):
+        """
+        Capture a screenshot for a result.
+
+        Returns raw JPEG bytes, or a file path when screenshot_dir is set —
+        in that mode Playwright writes straight to disk via CDP and the
+        image never passes through Python memory.
+        """
+        if self.screenshot_dir:
+            path = os.path.join(
+                self.screenshot_dir, f"action_{self._screenshot_seq:04d}.jpg")
+            self._screenshot_seq += 1
+            self.page.screenshot(path=path, type="jpeg", quality=75)
+            return path
+        self._screenshot_seq += 1
+        return self._capture_screenshot()
+
+    def _screenshot_diff(self, screenshot_bytes: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Build a diff record for the current screenshot vs. the previous one.
+
+        Returns a keyframe marker every keyframe_interval shots (or when
+        there is no previous shot); otherwise crops the screenshot to the
+        changed region and returns it as a small JPEG, which is typically
+        a few KB instead of a full-page image.
+        """
+        import io
+
+        prev = self._prev_screenshot
+        self._prev_screenshot = screenshot_bytes
+
+        if prev is None or self._screenshot_seq % self.keyframe_interval == 0:
+            self._keyframe_id = self._screenshot_seq
+            return {"keyframe": True, "keyframe_id": self._keyframe_id}
+
+        try:
+            prev_img = Image.open(io.BytesIO(prev)).convert("RGB")
+            cur_img = Image.open(io.BytesIO(screenshot_bytes)).convert("RGB")
+            bbox = ImageChops.difference(prev_img, cur_img).getbbox()
+        except Exception as e:
+            logger.debug("Screenshot diff failed: %s", e)
+            return None
+
+        if bbox is None:
+            # Nothing changed on screen
+            return {"bbox": None, "keyframe_id": self._keyframe_id}
+
+        buf = io.BytesIO()
+        cur_img.crop(bbox).save(buf, format="JPEG", quality=75)
+        return {
+            "bbox": list(bbox),
+            "data_b64": base64.b64encode(buf.getvalue()).decode('ascii'),
+            "keyframe_id": self._keyframe_id
+        }
+
     def execute(self, action: Dict[str, Any]) -> Dict[str, Any]:
         """
         Execute a single action and return the result.
@@ -56,104 +312,249 @@ class Executor:
         signals_seen = []
         error_msg = None
         
-        logger.info(f"Executing action: {action['type']}")
+        logger.info("Executing action: %s", action["type"])
         
         try:
             # Execute the action based on type
-            action_type = action["type"]
-            
-            if action_type == "click":
-                self._execute_click(action)
-            elif action_type == "fill":
-                self._execute_fill(action)
-            elif action_type == "select":
-                self._execute_select(action)
-            elif action_type == "navigate":
-                self._execute_navigate(action)
-            elif action_type == "scroll":
-                self._execute_scroll(action)
-            elif action_type == "wait":
-                self._execute_wait(action)
-            else:
-                raise ValueError(f"Unknown action type: {action_type}")
-            
-            # Wait for page to stabilize
-            time.sleep(1)
-            
-            # Check for expected signals
-            if "expect" in action and "timeout_ms" in action["expect"]:
-                wait_time = action["expect"]["timeout_ms"] / 1000
-                time.sleep(wait_time)
-            
-            post_url = self.page.url
-            
-            # Detect signals
-            if post_url != pre_url:
-                signals_seen.append("url_changed")
-            
-            # Try to detect network activity or DOM changes
-            # (simplified - in production you'd use page.wait_for_load_state)
+            self._run_action(action)
+
+            # Wait for the page to settle (event-driven, no fixed sleep)
             try:
-                self.page.wait_for_load_state("networkidle", timeout=3000)
-                signals_seen.append("network_idle")
+                self.page.wait_for_load_state("domcontentloaded", timeout=3000)
             except PlaywrightTimeoutError:
                 pass
-            
-            # Take screenshot
-            screenshot_bytes = self.page.screenshot()
-            screenshot_b64 = base64.b64encode(screenshot_bytes).decode('utf-8')
-            
+
+            # Wait for any signals the planner expects, returning as soon
+            # as one fires instead of sleeping for the full timeout
+            signals_seen.extend(self._wait_for_signals(action, pre_url))
+
+            post_url = self.page.url
+
+            # Detect signals
+            if post_url != pre_url:
+                # Navigation invalidates any cached locators
+                self._locator_cache.clear()
+                if "url_changed" not in signals_seen:
+                    signals_seen.append("url_changed")
+
+            # networkidle is only awaited when the planner asks for it via
+            # expect.signals (handled in _wait_for_signals) — an always-on
+            # idle wait burns its full timeout on pages with persistent
+            # analytics/long-poll traffic like OpenTable
+
+            # Take screenshot (skipped when the action opts out, e.g.
+            # intermediate wait/scroll steps nobody looks at)
+            if action.get("capture_screenshot", True):
+                screenshot_after = self._take_screenshot()
+            else:
+                screenshot_after = b""
+
             logger.info("Action executed successfully")
-            
-            return {
+
+            result = {
                 "ok": True,
                 "action": action,
                 "pre_url": pre_url,
                 "post_url": post_url,
                 "signals_seen": signals_seen,
-                "screenshot_after": screenshot_b64
+                "screenshot_after": screenshot_after
             }
-            
+
+            if self.diff_screenshots and isinstance(screenshot_after, bytes) \
+                    and screenshot_after:
+                diff = self._screenshot_diff(screenshot_after)
+                if diff is not None:
+                    result["screenshot_diff"] = diff
+
+            return result
+
         except Exception as e:
-            logger.error(f"Error executing action: {e}")
+            logger.error("Error executing action: %s", e)
             error_msg = str(e)
-            
+            self._locator_cache.clear()
+
             # Still try to capture post-state
             post_url = self.page.url
             
-            try:
-                screenshot_bytes = self.page.screenshot()
-                screenshot_b64 = base64.b64encode(screenshot_bytes).decode('utf-8')
-            except:
-                screenshot_b64 = ""
-            
+            screenshot_after = b""
+            if self.capture_on_error or action.get("capture_screenshot", True):
+                try:
+                    screenshot_after = self._take_screenshot()
+                except:
+                    pass
+
             return {
                 "ok": False,
                 "action": action,
                 "pre_url": pre_url,
                 "post_url": post_url,
                 "signals_seen": signals_seen,
-                "screenshot_after": screenshot_b64,
+                "screenshot_after": screenshot_after,
                 "error": error_msg
             }
     
+    def _run_action(self, action: Dict[str, Any]) -> None:
+        """Dispatch an action to its handler (no stabilization/screenshot)."""
+        handler = self._dispatch.get(action["type"])
+        if handler is None:
+            raise ValueError(f"Unknown action type: {action['type']}")
+        handler(action)
+
+    def execute_batch(self, actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Execute a sequence of actions with one stabilization wait and one
+        screenshot at the end instead of paying both per action.
+
+        Intended for contiguous non-navigating sequences such as
+        fill + fill + click. Each action still gets its own result entry;
+        only the final entry carries the screenshot and observed signals.
+        The batch stops at the first failing action.
+
+        Args:
+            actions: List of action dicts as produced by the planner
+
+        Returns:
+            List of result dicts, one per executed action
+        """
+        results: List[Dict[str, Any]] = []
+
+        for i, action in enumerate(actions):
+            if i == len(actions) - 1:
+                # Final action pays the full stabilization + screenshot cost
+                results.append(self.execute(action))
+                break
+
+            pre_url = self.page.url
+            logger.info("Executing batched action: %s", action["type"])
+
+            try:
+                self._run_action(action)
+            except Exception as e:
+                logger.error("Error executing batched action: %s", e)
+                self._locator_cache.clear()
+
+                screenshot_bytes = b""
+                if self.capture_on_error:
+                    try:
+                        screenshot_bytes = self._capture_screenshot()
+                    except:
+                        pass
+
+                results.append({
+                    "ok": False,
+                    "action": action,
+                    "pre_url": pre_url,
+                    "post_url": self.page.url,
+                    "signals_seen": [],
+                    "screenshot_after": screenshot_bytes,
+                    "error": str(e)
+                })
+                break
+
+            results.append({
+                "ok": True,
+                "action": action,
+                "pre_url": pre_url,
+                "post_url": self.page.url,
+                "signals_seen": [],
+                "screenshot_after": b""
+            })
+
+        return results
+
+    def _wait_for_signals(self, action: Dict[str, Any], pre_url: str) -> List[str]:
+        """
+        Poll for the signals the planner expects with exponential backoff,
+        returning as soon as the first one is satisfied.
+
+        Args:
+            action: Action dict (signals read from action["expect"]["signals"])
+            pre_url: URL before the action was executed
+
+        Returns:
+            List of signals that were observed
+        """
+        expect = action.get("expect") or {}
+        expected = expect.get("signals") or []
+
+        if not expected:
+            return []
+
+        timeout_s = expect.get("timeout_ms", 3000) / 1000
+        deadline = time.monotonic() + timeout_s
+        seen: List[str] = []
+        interval = 0.1
+
+        while time.monotonic() < deadline:
+            if "url_changed" in expected and self.page.url != pre_url:
+                seen.append("url_changed")
+                break
+
+            if "network_idle" in expected:
+                # Blocking wait with whatever budget remains
+                remaining_ms = max((deadline - time.monotonic()) * 1000, 1)
+                try:
+                    self.page.wait_for_load_state("networkidle", timeout=remaining_ms)
+                    seen.append("network_idle")
+                except PlaywrightTimeoutError:
+                    pass
+                break
+
+            time.sleep(interval)
+            interval = min(interval * 2, 0.8)
+
+        return seen
+
+    def _fast_click_by_id(self, element_id: str) -> bool:
+        """
+        Click an element by id with a single CDP round-trip.
+
+        Skips Playwright's actionability pipeline (~6 round-trips per
+        click), so this only suits callers that trust the observer's
+        visibility data. Returns False when the element is missing or the
+        CDP session is unavailable, letting the caller fall back.
+        """
+        cdp = self._get_cdp_session()
+        if not cdp:
+            return False
+
+        try:
+            result = cdp.send("Runtime.evaluate", {
+                "expression": (
+                    "(() => { const el = document.getElementById(%s); "
+                    "if (!el) return false; el.click(); return true; })()"
+                    % json.dumps(element_id)
+                ),
+                "returnByValue": True
+            })
+            return bool(result.get("result", {}).get("value"))
+        except Exception as e:
+            logger.warning("Fast id click failed, falling back: %s", e)
+            return False
+
     def _execute_click(self, action: Dict[str, Any]) -> None:
         """Execute a click action."""
         target = action["target"]
+
+        if self.fast_id_click and target.get("strategy") in ("id", "eid") \
+                and not action.get("force_scroll"):
+            if self._fast_click_by_id(target.get("value", "")):
+                logger.info("Fast-clicked element by id: %s", target.get("value"))
+                return
+
         element = self._find_element(target)
         
         if not element:
             raise Exception(f"Element not found: {target}")
-        
-        # Wait for element to be visible and enabled
-        element.wait_for(state="visible", timeout=5000)
-        
-        # Scroll into view if needed
-        element.scroll_into_view_if_needed()
-        
-        # Click
-        element.click()
-        logger.info(f"Clicked element: {target}")
+
+        # click() already runs the full actionability pipeline (visible,
+        # stable, scrolled into view) in one CDP exchange; the explicit
+        # wait_for + scroll_into_view calls were two extra round-trips
+        if action.get("force_scroll"):
+            element.scroll_into_view_if_needed()
+
+        element.click(timeout=5000)
+        logger.info("Clicked element: %s", target)
     
     def _execute_fill(self, action: Dict[str, Any]) -> None:
         """Execute a fill action."""
@@ -164,14 +565,10 @@ class Executor:
         
         if not element:
             raise Exception(f"Element not found: {target}")
-        
-        # Wait for element to be visible and enabled
-        element.wait_for(state="visible", timeout=5000)
-        
-        # Clear and fill
-        element.clear()
-        element.fill(value)
-        logger.info(f"Filled element with value: {value[:50]}...")
+
+        # fill() auto-waits for actionability and clears the field itself
+        element.fill(value, timeout=5000)
+        logger.info("Filled element with value: %.50s...", value)
     
     def _execute_select(self, action: Dict[str, Any]) -> None:
         """Execute a select dropdown action."""
@@ -182,51 +579,54 @@ class Executor:
         
         if not element:
             raise Exception(f"Element not found: {target}")
-        
-        # Wait for element to be visible and enabled
-        element.wait_for(state="visible", timeout=5000)
-        
-        # Scroll into view
-        element.scroll_into_view_if_needed()
-        
+
+        if action.get("force_scroll"):
+            element.scroll_into_view_if_needed()
+
         # Try different selection strategies
         try:
             # Strategy 1: Select by value attribute
             element.select_option(value=value)
-            logger.info(f"Selected option by value: {value}")
+            logger.info("Selected option by value: %s", value)
         except Exception as e1:
-            logger.warning(f"Could not select by value, trying by label: {e1}")
+            logger.warning("Could not select by value, trying by label: %s", e1)
             try:
                 # Strategy 2: Select by visible text/label
-                # Extract time from the value (e.g., "2000-02-01T19:00:00" -> "7:00 PM")
-                if "T" in value:
-                    time_part = value.split("T")[1]  # "19:00:00"
-                    hour = int(time_part.split(":")[0])
-                    minute = int(time_part.split(":")[1])
-                    
-                    # Convert to 12-hour format
-                    period = "AM" if hour < 12 else "PM"
-                    display_hour = hour if hour <= 12 else hour - 12
-                    if display_hour == 0:
-                        display_hour = 12
-                    
-                    label = f"{display_hour}:{minute:02d} {period}"
+                # Convert the value (e.g., "2000-02-01T19:00:00" -> "7:00 PM")
+                if len(value) >= 11 and value[10] == "T":
+                    label = self._time_label(value)
                     element.select_option(label=label)
-                    logger.info(f"Selected option by label: {label}")
+                    logger.info("Selected option by label: %s", label)
                 else:
                     raise Exception("Could not parse time value")
             except Exception as e2:
-                logger.warning(f"Could not select by label, trying by index: {e2}")
+                logger.warning("Could not select by label, trying by index: %s", e2)
                 # Strategy 3: Click the element and try to select
                 element.click()
-                time.sleep(0.5)
-                
-                # Try to find and click the option in the expanded dropdown
+
+                # Wait for the option to actually appear instead of racing
+                # the dropdown animation against a fixed sleep
                 option_selector = f'option[value="{value}"]'
+                self.page.wait_for_selector(option_selector, state="visible",
+                                            timeout=2000)
                 self.page.locator(option_selector).click()
-                logger.info(f"Selected option by clicking: {value}")
+                logger.info("Selected option by clicking: %s", value)
     
     
+    def _time_label(self, value: str) -> str:
+        """
+        Convert an ISO datetime value to its 12-hour display label, cached
+        so retry loops across many time slots pay the parse only once.
+        """
+        label = self._time_label_cache.get(value)
+        if label is None:
+            dt = datetime.fromisoformat(value)
+            display_hour = dt.hour % 12 or 12
+            period = "AM" if dt.hour < 12 else "PM"
+            label = f"{display_hour}:{dt.minute:02d} {period}"
+            self._time_label_cache[value] = label
+        return label
+
     def _execute_navigate(self, action: Dict[str, Any]) -> None:
         """Execute a navigation action."""
         url = action.get("value", "")
@@ -234,8 +634,10 @@ class Executor:
         if not url:
             raise Exception("Navigate action requires a URL value")
         
-        self.page.goto(url, wait_until="networkidle")
-        logger.info(f"Navigated to: {url}")
+        # networkidle rarely fires on ad-heavy pages (see the click path's
+        # signal handling); DOMContentLoaded is both faster and reliable
+        self.page.goto(url, wait_until="domcontentloaded")
+        logger.info("Navigated to: %s", url)
     
     def _execute_scroll(self, action: Dict[str, Any]) -> None:
         """Execute a scroll action."""
@@ -243,10 +645,10 @@ class Executor:
         value = target.get("value", "")
         
         if value == "bottom":
-            self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            self._evaluate_fast("window.scrollTo(0, document.body.scrollHeight)")
             logger.info("Scrolled to bottom")
         elif value == "top":
-            self.page.evaluate("window.scrollTo(0, 0)")
+            self._evaluate_fast("window.scrollTo(0, 0)")
             logger.info("Scrolled to top")
         else:
             # Try to find and scroll to element
@@ -256,14 +658,14 @@ class Executor:
                 logger.info("Scrolled to element")
             else:
                 # Default to page down
-                self.page.keyboard.press("PageDown")
+                self._press_key_fast("PageDown")
                 logger.info("Scrolled down one page")
     
     def _execute_wait(self, action: Dict[str, Any]) -> None:
         """Execute a wait action."""
         wait_time = action.get("expect", {}).get("timeout_ms", 2000) / 1000
         time.sleep(wait_time)
-        logger.info(f"Waited for {wait_time} seconds")
+        logger.info("Waited for %s seconds", wait_time)
     
     # def _find_element(self, target: Dict[str, Any]):
     #     """
@@ -316,16 +718,38 @@ class Executor:
     def _find_element(self, target: Dict[str, Any]):
         """
         Find an element based on the target strategy.
-        
+
+        Resolved locators are cached per (url, strategy, value, role, name)
+        so repeated lookups of the same target (retries, multi-step fills)
+        skip the resolution work. The cache is cleared on navigation.
+
         Args:
             target: Target dict with strategy and value
-        
+
         Returns:
             Playwright Locator or None
         """
+        cache_key = (
+            self.page.url,
+            target.get("strategy", ""),
+            target.get("value", ""),
+            target.get("role"),
+            target.get("name")
+        )
+        cached = self._locator_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        locator = self._resolve_locator(target)
+        if locator is not None:
+            self._locator_cache[cache_key] = locator
+        return locator
+
+    def _resolve_locator(self, target: Dict[str, Any]):
+        """Build a Playwright Locator for the target (uncached)."""
         strategy = target.get("strategy", "")
         value = target.get("value", "")
-        
+
         try:
             if strategy == "id":
                 return self.page.locator(f"#{value}")
@@ -334,35 +758,50 @@ class Executor:
                 return self.page.locator(value)
             
             elif strategy == "text":
-                locator = self.page.get_by_text(value, exact=False)
-                # If multiple elements found, use first one
-                if locator.count() > 1:
-                    logger.warning(f"Multiple elements found with text '{value}', using first one")
-                    return locator.first
-                return locator
-            
+                # Playwright's text engine is faster than get_by_text,
+                # which runs querySelectorAll('*') plus injected-JS matching
+                locator = self.page.locator(f"text=/{re.escape(value)}/i")
+                if locator.count() == 0:
+                    locator = self.page.get_by_text(value, exact=False)
+                # .first is free (index on the existing locator) and avoids
+                # an extra count() round-trip just to log ambiguity
+                return locator.first
+
             elif strategy == "aria":
-                locator = self.page.get_by_label(value)
-                # If multiple elements found, use first one
-                if locator.count() > 1:
-                    logger.warning(f"Multiple elements found with aria-label '{value}', using first one")
-                    return locator.first
-                return locator
-            
+                # Escaped CSS fast path; any selector error (not just an
+                # empty match) falls back to the label engine, which
+                # handles arbitrary values
+                locator = None
+                try:
+                    v = _css_attr_escape(value)
+                    candidate = self.page.locator(
+                        f'[aria-label="{v}"], [aria-labelledby*="{v}"]')
+                    if candidate.count() > 0:
+                        locator = candidate
+                except Exception as e:
+                    logger.debug("aria fast path failed (%s), using get_by_label", e)
+                if locator is None:
+                    locator = self.page.get_by_label(value)
+                return locator.first
+
             elif strategy == "role":
                 role = target.get("role", "button")
-                name = target.get("name")
-                if name:
+                name = target.get("name") or value
+                # Explicit-role CSS fast path; falls back to the accessible
+                # name engine when nothing carries a role attribute or the
+                # name breaks the selector
+                locator = None
+                try:
+                    candidate = self.page.locator(
+                        f'[role="{_css_attr_escape(role)}"]'
+                        f'[aria-label*="{_css_attr_escape(name)}"]')
+                    if candidate.count() > 0:
+                        locator = candidate
+                except Exception as e:
+                    logger.debug("role fast path failed (%s), using get_by_role", e)
+                if locator is None:
                     locator = self.page.get_by_role(role, name=name)
-                else:
-                    # Find by role and value as name
-                    locator = self.page.get_by_role(role, name=value)
-                
-                # If multiple elements found, use first one
-                if locator.count() > 1:
-                    logger.warning(f"Multiple elements found with role '{role}', using first one")
-                    return locator.first
-                return locator
+                return locator.first
             
             elif strategy == "eid":
                 # Custom element ID strategy - fallback to id
@@ -370,19 +809,87 @@ class Executor:
             
             else:
                 # Default fallback to CSS selector
-                logger.warning(f"Unknown strategy '{strategy}', trying as CSS selector")
+                logger.warning("Unknown strategy '%s', trying as CSS selector", strategy)
                 return self.page.locator(value)
-                
+
         except Exception as e:
-            logger.error(f"Error finding element with strategy {strategy}: {e}")
+            logger.error("Error finding element with strategy %s: %s", strategy, e)
             return None
 
 
+class ExecutorPool:
+    """
+    Pool of pre-warmed browser pages for short-lived automation runs.
+
+    Browser startup (500ms-3s) dominates short sessions; the pool launches
+    one Chromium instance up front and keeps N ready pages so each run
+    skips the cold start. Pages are reset (cookies cleared) on release.
+    """
+
+    def __init__(self, size: int = 1, headless: bool = True):
+        """
+        Start the browser and pre-warm the pool.
+
+        Args:
+            size: Number of pages to pre-warm
+            headless: Whether to launch Chromium headless
+        """
+        from playwright.sync_api import sync_playwright
+
+        self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch(headless=headless)
+        self._idle: List[Page] = [self._new_page() for _ in range(size)]
+        logger.info("ExecutorPool ready with %d pre-warmed page(s)", size)
+
+    def _new_page(self) -> Page:
+        context = self._browser.new_context()
+        return context.new_page()
+
+    def acquire(self) -> Executor:
+        """Get an Executor bound to a ready page (grows the pool if empty)."""
+        page = self._idle.pop() if self._idle else self._new_page()
+        return Executor(page)
+
+    def release(self, executor: Executor) -> None:
+        """Reset the executor's page and return it to the pool."""
+        try:
+            executor.page.context.clear_cookies()
+            self._idle.append(executor.page)
+        except Exception as e:
+            logger.warning("Could not recycle page, dropping it: %s", e)
+
+    def close(self) -> None:
+        """Close the browser and stop Playwright."""
+        self._browser.close()
+        self._playwright.stop()
+
+
+def screenshot_b64(result: Dict[str, Any]) -> str:
+    """
+    Return the base64 form of a result's screenshot, encoding at most once.
+
+    The executor returns raw bytes under "screenshot_after"; consumers that
+    really need base64 (e.g. LLM vision payloads) call this and the encoded
+    string is cached on the result dict under "screenshot_after_b64".
+    """
+    cached = result.get("screenshot_after_b64")
+    if cached is not None:
+        return cached
+
+    raw = result.get("screenshot_after") or b""
+    if isinstance(raw, str):
+        # screenshot_dir mode stores a file path; read lazily
+        with open(raw, "rb") as f:
+            raw = f.read()
+    encoded = base64.b64encode(raw).decode('ascii') if raw else ""
+    result["screenshot_after_b64"] = encoded
+    return encoded
+
+
 # Example usage
 if __name__ == "__main__":
-    from playwright.sync_api import sync_playwright
     import json
-    
+
     # Example action to execute
     example_action = {
         "type": "click",
@@ -395,24 +902,22 @@ if __name__ == "__main__":
             "timeout_ms": 2000
         }
     }
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page()
-        page.goto("https://www.opentable.com")
-        
-        # Create executor
-        executor = Executor(page)
-        
-        # Execute action
-        result = executor.execute(example_action)
-        
-        # Print result
-        print("\nExecution Result:")
-        print(json.dumps({
-            **result,
-            "screenshot_after": f"<base64 data: {len(result['screenshot_after'])} chars>"
-        }, indent=2))
-        
-        input("\nPress Enter to close browser...")
-        browser.close()
\ No newline at end of file
+
+    # Acquire a pre-warmed page from the pool instead of cold-starting
+    pool = ExecutorPool(size=1, headless=False)
+    executor = pool.acquire()
+    executor.page.goto("https://www.opentable.com")
+
+    # Execute action
+    result = executor.execute(example_action)
+
+    # Print result
+    print("\nExecution Result:")
+    print(json.dumps({
+        **result,
+        "screenshot_after": f"<{len(result['screenshot_after'])} bytes>"
+    }, indent=2))
+
+    input("\nPress Enter to close browser...")
+    pool.release(executor)
+    pool.close()
\ No newline at end of file
@@ -4,10 +4,26 @@ main.py - Full pipeline with Observer → Planner → Executor → Verifier loop
 Runs the complete automation loop until end state is reached.
 """
 
+import argparse
+import hashlib
 import json
+import logging
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+
+try:
+    import orjson  # Optional: C-speed serialization for the big state dumps
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # Optional: binary run log (--format msgpack)
+except ImportError:
+    msgpack = None
 from playwright.sync_api import sync_playwright
 from observer import DOMObserver
 from planner import Planner
@@ -15,34 +31,96 @@ from executor import Executor
 from verifier import Verifier
 
 
+def _dumps(obj):
+    """Serialize obj to compact JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+# Appends may come from either I/O pool worker; the lock keeps lines whole
+_LOG_LOCK = threading.Lock()
+
+
+def log_record(fp, it, kind, data, use_msgpack=False):
+    """Append one {"it", "kind", "data"} envelope to the run log.
+
+    One buffered fd for the whole run replaces four file creations per
+    iteration — the serialize-then-single-write pattern keeps syscalls
+    amortized. msgpack blobs are self-delimiting, so the binary format
+    needs no newline framing (read back with msgpack.Unpacker).
+    """
+    # The envelope carries the audit timestamp so observations themselves
+    # stay timestamp-free (and therefore hash/cache stable)
+    envelope = {"it": it, "kind": kind, "ts": round(time.time(), 3),
+                "data": data}
+    if use_msgpack:
+        blob = msgpack.packb(envelope, use_bin_type=True)
+    else:
+        blob = _dumps(envelope) + b"\n"
+    with _LOG_LOCK:
+        fp.write(blob)
+
+
+def state_hash(page_state):
+    """Digest of the parts of a page state the planner actually reasons about.
+
+    Timestamps and raw visible text churn on every observation even when
+    nothing actionable changed, so they are excluded.
+    """
+    stable = {k: v for k, v in page_state.items()
+              if k not in ("timestamp", "visible_text")}
+    if orjson is not None:
+        payload = orjson.dumps(stable, option=orjson.OPT_SORT_KEYS)
+    else:
+        payload = json.dumps(stable, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
 def main():
     """Run the complete automation pipeline with loop."""
-    
+
+    # Logging is configured here, by the application — the library
+    # modules only create loggers and leave global config alone
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="OpenTable reservation agent")
+    parser.add_argument("task", nargs="*",
+                        help="Reservation request (prompted for if omitted)")
+    parser.add_argument("--no-headless", dest="headless", action="store_false",
+                        help="Show the browser window (headful is ~2x slower)")
+    parser.add_argument("--wait-on-exit", action="store_true",
+                        help="Keep the browser open until Enter is pressed")
+    parser.add_argument("--format", choices=("json", "msgpack"), default="json",
+                        help="Run-log encoding: json stays greppable, "
+                             "msgpack is smaller and faster to encode")
+    parser.set_defaults(headless=True)
+    args = parser.parse_args()
+
     # Check for API key
     if not os.getenv("GEMINI_API_KEY"):
         print("Error: GEMINI_API_KEY not set")
         print("Get your key from: https://makersuite.google.com/app/apikey")
         print("Then run: export GEMINI_API_KEY='your-key-here'")
         sys.exit(1)
-    
-    print("\n" + "="*70)
-    print("OpenTable Reservation Bot")
-    print("="*70)
-    print("\nExamples:")
-    print("  - Book me a table at Ruth's Chris for 7pm for 2 people")
-    print("  - Reserve a table at Fleming's Steakhouse at 8:30pm for 4")
-    print("  - Find a reservation at The Capital Grille tomorrow at 6pm")
-    print("="*70 + "\n")
-    
-    task = input("Enter your reservation request: ").strip()
-    
+
+    task = " ".join(args.task).strip()
+    if not task:
+        print("\n" + "="*70)
+        print("OpenTable Reservation Bot")
+        print("="*70)
+        print("\nExamples:")
+        print("  - Book me a table at Ruth's Chris for 7pm for 2 people")
+        print("  - Reserve a table at Fleming's Steakhouse at 8:30pm for 4")
+        print("  - Find a reservation at The Capital Grille tomorrow at 6pm")
+        print("="*70 + "\n")
+
+        task = input("Enter your reservation request: ").strip()
+
     if not task:
         print("\nError: Task cannot be empty")
         sys.exit(1)
-    # Get task from command line or use default
-    # task = " ".join(sys.argv[1:]) if len(sys.argv) > 1 else \
-    #        "Book me a reservation for Fleming's Steakhouse at 7pm for 2 people on January 2"
-    
+
     # Create output directory
     output_dir = Path("output")
     output_dir.mkdir(exist_ok=True)
@@ -57,21 +135,54 @@ def main():
     # Start browser
     print("Starting browser...")
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page()
-        page.goto("https://www.opentable.com", wait_until="networkidle")
+        browser = p.chromium.launch(headless=args.headless)
+        # A shared context keeps the HTTP cache warm for every page the run
+        # opens; service workers are blocked so they can't intercept fetches
+        context = browser.new_context(service_workers="block")
+        # Fail fast: the default 30s Playwright timeout turns a missing
+        # element into half a minute of dead air per attempt. Navigations
+        # get their own, larger budget — a full page load legitimately
+        # takes longer than an element lookup
+        context.set_default_timeout(5000)
+        context.set_default_navigation_timeout(15000)
+        page = context.new_page()
+        # networkidle on an ad-heavy site stalls for seconds after the page
+        # is usable; DOMContentLoaded plus an explicit wait on the search
+        # widget is both faster and a stronger readiness signal
+        page.goto("https://www.opentable.com", wait_until="domcontentloaded",
+                  timeout=15000)
+        try:
+            page.wait_for_selector("input[aria-label], input[type='search'], form",
+                                   timeout=5000)
+        except Exception:
+            pass  # Page may use a variant layout; the observer copes either way
         print("✓ Browser ready\n")
         
         # Initialize components
         observer = DOMObserver(page)
         planner = Planner(model_name="gemini-flash-latest")
-        executor = Executor(page)
+        executor = Executor(page, screenshot_dir=str(output_dir))
         verifier = Verifier(page)
-        
+
+        # Artifact writes run here so the loop never blocks on disk; the
+        # futures are collected and drained once, before the browser closes
+        io_pool = ThreadPoolExecutor(max_workers=2)
+        pending_writes = []
+        use_msgpack = args.format == "msgpack" and msgpack is not None
+        if args.format == "msgpack" and msgpack is None:
+            print("Warning: msgpack not installed, falling back to json run log")
+        log_name = "run.msgpack" if use_msgpack else "run.jsonl"
+        log_fp = open(output_dir / log_name, "ab", buffering=1 << 16)
+
         # Main loop
         iteration = 0
         max_iterations = 15
-        
+        prev_state_hash = None
+        plan = None
+        skip_planner = False
+        retry_count = 0
+        max_retries = 2
+
         while iteration < max_iterations:
             print(f"{'='*70}")
             print(f"ITERATION {iteration + 1}")
@@ -82,22 +193,54 @@ def main():
             page_state = observer.observe()
             print(f"    ✓ Found {len(page_state['buttons'])} buttons, "
                   f"{len(page_state['text_inputs'])} inputs")
-            
-            # Save state
-            state_file = output_dir / f"state_{iteration:03d}.json"
-            with open(state_file, "w") as f:
-                json.dump(page_state, f, indent=2)
-            
+
+            # If the page looks identical to last iteration it probably
+            # hasn't settled after the previous action — give it a moment
+            # and observe again before burning a planner round-trip
+            current_hash = state_hash(page_state)
+            if current_hash == prev_state_hash:
+                print("    · Page unchanged since last iteration, waiting for it to settle...")
+                try:
+                    page.wait_for_load_state("networkidle", timeout=2000)
+                except Exception:
+                    pass
+                page_state = observer.observe()
+                current_hash = state_hash(page_state)
+            prev_state_hash = current_hash
+
+            # Log state in the background: the planner call below is a
+            # pure network round-trip that never touches the page, so the
+            # (large) state dump overlaps the Gemini latency instead of
+            # adding to it
+            pending_writes.append(io_pool.submit(
+                log_record, log_fp, iteration, "state", page_state, use_msgpack))
+
             # STEP 2: PLAN
-            print(f"[{iteration + 1}] Generating plan...")
-            plan = planner.plan(task=task, page_state=page_state)
+            # When the verifier saw no DOM delta after the last action,
+            # the previous plan is still the right answer — retry it
+            # (capped) instead of paying a Gemini round-trip for an
+            # identical page
+            if skip_planner and plan is not None and retry_count < max_retries:
+                retry_count += 1
+                print(f"[{iteration + 1}] Page unchanged, retrying previous "
+                      f"action ({retry_count}/{max_retries})...")
+            else:
+                if skip_planner and plan is not None:
+                    # Retries exhausted on an unchanged page: the cached
+                    # plan is demonstrably not working, so evict it or the
+                    # planner would hand back the same one without ever
+                    # consulting the model
+                    planner.invalidate_last_plan()
+                print(f"[{iteration + 1}] Generating plan...")
+                plan = planner.plan(task=task, page_state=page_state)
+                retry_count = 0
+            skip_planner = False
             print(f"    ✓ Decision: {plan['decision']}")
             print(f"    ✓ Reason: {plan['reason'][:80]}...")
             
-            # Save plan
-            plan_file = output_dir / f"plan_{iteration:03d}.json"
-            with open(plan_file, "w") as f:
-                json.dump(plan, f, indent=2)
+            # Log plan
+            pending_writes.append(io_pool.submit(
+                log_record, log_fp, iteration, "plan", plan, use_msgpack))
             
             # Handle decision
             if plan['decision'] == 'stop':
@@ -132,20 +275,18 @@ def main():
                     print(f"    ✗ Failed: {result.get('error', 'Unknown error')}")
                 
                 # Save execution result
-                exec_file = output_dir / f"execution_{iteration:03d}.json"
-                with open(exec_file, "w") as f:
-                    json.dump({
-                        **result,
-                        "screenshot_after": f"<{len(result['screenshot_after'])} chars>"
-                    }, f, indent=2)
-                
-                # Save screenshot
-                if result['screenshot_after']:
-                    import base64
-                    screenshot_data = base64.b64decode(result['screenshot_after'])
-                    screenshot_file = output_dir / f"screenshot_{iteration:03d}.png"
-                    with open(screenshot_file, "wb") as f:
-                        f.write(screenshot_data)
+                # Screenshots are streamed to disk by the executor; the log
+                # records the file path, or just the byte count when the
+                # executor returned raw bytes inline
+                screenshot = result['screenshot_after']
+                logged = dict(result)
+                if isinstance(screenshot, str):
+                    logged["screenshot_after"] = screenshot
+                else:
+                    del logged["screenshot_after"]
+                    logged["screenshot_bytes_len"] = len(screenshot)
+                pending_writes.append(io_pool.submit(
+                    log_record, log_fp, iteration, "execution", logged, use_msgpack))
                 
                 # STEP 4: VERIFY
                 print(f"[{iteration + 1}] Verifying state...")
@@ -153,10 +294,9 @@ def main():
                 print(f"    ✓ Status: {verification['status']}")
                 print(f"    ✓ Reason: {verification['reason'][:80]}...")
                 
-                # Save verification
-                verify_file = output_dir / f"verification_{iteration:03d}.json"
-                with open(verify_file, "w") as f:
-                    json.dump(verification, f, indent=2)
+                # Log verification
+                pending_writes.append(io_pool.submit(
+                    log_record, log_fp, iteration, "verification", verification, use_msgpack))
                 
                 # Check verification status
                 if verification['status'] == 'finish':
@@ -176,6 +316,7 @@ def main():
                     break
                 
                 elif verification['status'] == 'continue':
+                    skip_planner = verification.get('skip_planner', False)
                     print(f"    ✓ Continuing to next iteration...\n")
                     iteration += 1
                     continue
@@ -199,8 +340,17 @@ def main():
         print(f"Output directory: {output_dir}/")
         print(f"{'='*70}\n")
         
-        # Keep browser open for review
-        input("Press Enter to close browser...")
+        # Drain outstanding artifact writes (surfacing any write error)
+        # before the browser goes away
+        for fut in pending_writes:
+            fut.result()
+        io_pool.shutdown(wait=True)
+        log_fp.close()
+
+        # Keep browser open for review only when explicitly requested —
+        # the stdin block otherwise prevents unattended/batch runs
+        if args.wait_on_exit:
+            input("Press Enter to close browser...")
         browser.close()
 
 
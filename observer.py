@@ -1,475 +1,695 @@
 import json
+import time
 from typing import Dict, List, Any, Optional
-from playwright.sync_api import Page, ElementHandle
+
+try:
+    import orjson  # Optional: C-speed serialization for big state dumps
+except ImportError:
+    orjson = None
+
+try:
+    from lxml import html as lxml_html  # Optional: in-process text extraction
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_html = None
+    lxml_etree = None
+from playwright.sync_api import Page, ElementHandle, TimeoutError as PlaywrightTimeoutError
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Category selectors, frozen once at import and interpolated into the
+# extraction script below — nothing is joined or rebuilt per observation.
+_BUTTON_SELECTOR = ('button, input[type="button"], input[type="submit"], '
+                    '[role="button"], a.btn, .button')
+_TEXT_INPUT_SELECTOR = ('input[type="text"], input[type="email"], '
+                        'input[type="tel"], input[type="number"], '
+                        'input[type="search"], input[type="date"], '
+                        'input[type="time"], input:not([type]), textarea')
+_CLICKABLE_SELECTOR = '[onclick], [role="tab"], [role="menuitem"]'
+_COMBINED_SELECTOR = ', '.join((_BUTTON_SELECTOR, _TEXT_INPUT_SELECTOR,
+                                _CLICKABLE_SELECTOR, 'select, a[href], form'))
+
+
+# Single-pass DOM extraction, shipped to the browser once per page (via
+# add_init_script) so each observation is one tiny evaluate call instead of
+# re-sending and re-parsing ~3KB of JS per extractor per iteration.
+_OBSERVE_JS = """
+(opts) => new Promise(resolve => {
+    opts = opts || {};
+    // Positions are opt-in: rects are still read once each for the
+    // visibility test, but the payload only carries them when asked.
+    const withPos = !!opts.withPos;
+    const maxEl = opts.max === undefined ? 500 : opts.max;
+    // The snapshot runs right after a frame paints, so layout is clean
+    // and the geometry reads below never force a synchronous flush. The
+    // extraction itself performs no DOM writes, so nothing re-dirties
+    // layout mid-pass. setTimeout backstops occluded or backgrounded
+    // pages where requestAnimationFrame never fires.
+    const snapshot = () => {
+        function findLabel(el) {
+            // Try to find associated label
+            if (el.id) {
+                const label = document.querySelector(`label[for="${el.id}"]`);
+                if (label) return label.innerText.trim();
+            }
+
+            // Check if input is inside a label
+            const parentLabel = el.closest('label');
+            if (parentLabel) return parentLabel.innerText.trim();
+
+            return null;
+        }
+
+        // Sibling indices are precomputed one parent at a time and memoized,
+        // so anonymous elements in long lists (search results, time slots)
+        // cost O(1) each instead of re-walking previousElementSibling chains.
+        const nthIndex = new WeakMap();
+        function nthOfType(el) {
+            let idx = nthIndex.get(el);
+            if (idx === undefined) {
+                const counts = new Map();
+                for (const child of el.parentElement.children) {
+                    const t = child.tagName;
+                    const n = (counts.get(t) || 0) + 1;
+                    counts.set(t, n);
+                    nthIndex.set(child, n);
+                }
+                idx = nthIndex.get(el);
+            }
+            return idx;
+        }
+
+        // Selector memoization: elements that land in several buckets (an
+        // a.btn is both a button and a link) pay for construction once,
+        // and identical className strings are split/joined only once.
+        const selCache = new WeakMap();
+        const classCache = new Map();
+        function classSuffix(className) {
+            let suffix = classCache.get(className);
+            if (suffix === undefined) {
+                suffix = '.' + className.trim().split(/\\s+/).join('.');
+                classCache.set(className, suffix);
+            }
+            return suffix;
+        }
+
+        function generateSelector(el) {
+            const hit = selCache.get(el);
+            if (hit !== undefined) return hit;
+            const sel = buildSelector(el);
+            selCache.set(el, sel);
+            return sel;
+        }
+
+        function buildSelector(el) {
+            if (el.id) return `#${el.id}`;
+            // OpenTable tags most controls with data-testid/data-test — an O(1)
+            // exit that also beats the ancestor walk on stability
+            const testId = el.getAttribute('data-testid') || el.getAttribute('data-test');
+            if (testId) {
+                return el.hasAttribute('data-testid')
+                    ? `[data-testid="${testId}"]` : `[data-test="${testId}"]`;
+            }
+            if (el.name) return `[name="${el.name}"]`;
+            if (el.tagName === 'A' && el.getAttribute('href')) {
+                return `a[href="${el.getAttribute('href')}"]`;
+            }
+
+            let path = [];
+            let current = el;
+            while (current.parentElement) {
+                let selector = current.tagName.toLowerCase();
+                if (current.className && typeof current.className === 'string' && current.className.trim()) {
+                    selector += classSuffix(current.className);
+                } else {
+                    selector += `:nth-of-type(${nthOfType(current)})`;
+                }
+                path.unshift(selector);
+                current = current.parentElement;
+                if (path.length > 3) break; // Limit depth
+            }
+            return path.join(' > ');
+        }
+
+        // One pass over the attribute list gathers data-* and aria-label
+        // together, replacing the separate data-attribute loop plus
+        // getAttribute('aria-label') read; charCodeAt screens out
+        // non-'d' names before the startsWith call.
+        function scanAttributes(el) {
+            const data = {};
+            let aria = null;
+            const attrs = el.attributes;
+            for (let i = 0; i < attrs.length; i++) {
+                const a = attrs[i];
+                const n = a.name;
+                if (n.charCodeAt(0) === 100 && n.startsWith('data-')) {
+                    data[n] = a.value;
+                } else if (n === 'aria-label') {
+                    aria = a.value;
+                }
+            }
+            return {data, aria};
+        }
+
+        // Long innerText blobs inflate the CDP payload and the planner prompt;
+        // clip at extraction time so the bytes never leave the browser.
+        function clip(s, n) {
+            if (!s) return '';
+            s = s.trim();
+            return s.length > n ? s.slice(0, n) : s;
+        }
+
+        // One combined traversal instead of six separate querySelectorAll
+        // scans; each element is visited once, visibility and geometry are
+        // read at most once, and elements are dispatched into their buckets
+        // during the pass (no throwaway intermediate arrays). The selector
+        // literals are substituted from the module constants at import.
+        const BUTTONISH = '__BUTTONISH__';
+        const TEXT_INPUT = '__TEXT_INPUT__';
+        const CLICKABLE = '__CLICKABLE__';
+        const COMBINED = '__COMBINED__';
+
+        // Partial evaluation per URL pattern: when the caller already
+        // knows this page family has no [onclick]/tab/menuitem elements,
+        // the selector union and the bucket branch are dropped entirely.
+        const skipClickable = !!opts.skipClickable;
+        const combinedSel = skipClickable
+            ? COMBINED.replace(CLICKABLE + ', ', '')
+            : COMBINED;
+
+        const buttons = [];
+        const text_inputs = [];
+        const select_dropdowns = [];
+        const links = [];
+        const clickable_elements = [];
+        const form_elements = [];
+        // Elements already reported as buttons or links are skipped by the
+        // clickable bucket, which otherwise overlaps them heavily
+        const recorded = new WeakSet();
+
+        // Listing pages repeat the same control dozens of times (one "Book"
+        // button per restaurant card). Identical (tag, text, aria-label)
+        // records collapse into one representative carrying a count and up to
+        // 10 alternate selectors; elements more than 200px apart vertically
+        // stay separate, since they usually belong to different sections.
+        const seen = new Map();
+        function dedup(bucket, record) {
+            const key = bucket === buttons ? 'b|' : 'l|';
+            const full = key + (record.tag || '') + '|' + (record.href || '') + '|' +
+                (record.text || '') + '|' + (record.aria_label || '');
+            let reps = seen.get(full);
+            if (reps === undefined) {
+                seen.set(full, [record]);
+                bucket.push(record);
+                return;
+            }
+            for (const rep of reps) {
+                if (Math.abs(rep.position[1] - record.position[1]) <= 200) {
+                    rep.count = (rep.count || 1) + 1;
+                    if (!rep.selectors) rep.selectors = [];
+                    if (rep.selectors.length < 10) rep.selectors.push(record.selector);
+                    return;
+                }
+            }
+            reps.push(record);
+            bucket.push(record);
+        }
+
+        // Flush layout once up front; every geometry read below is then a
+        // plain lookup against clean layout, never a forced reflow.
+        document.body.getBoundingClientRect();
+
+        for (const el of document.querySelectorAll(combinedSel)) {
+            if (el.tagName === 'FORM') {
+                const inputs = Array.from(el.querySelectorAll('input, textarea, select')).map(f => ({
+                    type: f.type || f.tagName.toLowerCase(),
+                    name: f.name,
+                    id: f.id,
+                    required: f.required
+                }));
+
+                form_elements.push({
+                    index: form_elements.length,
+                    id: el.id || null,
+                    name: el.name || null,
+                    action: el.action || null,
+                    method: el.method || null,
+                    inputs: inputs,
+                    selector: el.id ? `#${el.id}` : `form:nth-of-type(${nthOfType(el)})`
+                });
+                continue;
+            }
+
+            // A collapsed box means the element isn't rendered; unlike
+            // offsetParent this doesn't invalidate style per element, and
+            // the rect doubles as the record's position
+            const r = el.getBoundingClientRect();
+            if (r.width === 0 && r.height === 0) continue;
+            // Tuple-style [x, y, width, height]: four keys per element add
+            // up fast in the state dump, and Python-side consumers index
+            // the array just as easily
+            const rect = [r.x, r.y, r.width, r.height];
+            const pos = () => rect;
+
+            if (el.matches(BUTTONISH)) {
+                recorded.add(el);
+                const scanned = scanAttributes(el);
+                dedup(buttons, {
+                    index: buttons.length,
+                    tag: el.tagName.toLowerCase(),
+                    text: clip(el.innerText, 80) || el.value || '',
+                    id: el.id || null,
+                    class: el.className || null,
+                    name: el.name || null,
+                    type: el.type || null,
+                    aria_label: clip(scanned.aria, 120) || null,
+                    data_attributes: scanned.data,
+                    is_visible: true,
+                    is_enabled: !el.disabled,
+                    position: pos(),
+                    selector: generateSelector(el)
+                });
+            }
+
+            if (el.matches(TEXT_INPUT)) {
+                text_inputs.push({
+                    index: text_inputs.length,
+                    tag: el.tagName.toLowerCase(),
+                    type: el.type || 'text',
+                    id: el.id || null,
+                    name: el.name || null,
+                    placeholder: el.placeholder || null,
+                    value: el.value || '',
+                    class: el.className || null,
+                    aria_label: el.getAttribute('aria-label') || null,
+                    label: findLabel(el),
+                    is_required: el.required || false,
+                    is_enabled: !el.disabled,
+                    max_length: el.maxLength > 0 ? el.maxLength : null,
+                    pattern: el.pattern || null,
+                    position: pos(),
+                    selector: generateSelector(el)
+                });
+            }
+
+            if (el.tagName === 'SELECT') {
+                const options = Array.from(el.options).map(opt => ({
+                    text: opt.text,
+                    value: opt.value,
+                    selected: opt.selected
+                }));
+
+                select_dropdowns.push({
+                    index: select_dropdowns.length,
+                    id: el.id || null,
+                    name: el.name || null,
+                    class: el.className || null,
+                    label: findLabel(el),
+                    current_value: el.value,
+                    options: options,
+                    is_multiple: el.multiple,
+                    is_enabled: !el.disabled,
+                    position: pos(),
+                    selector: generateSelector(el)
+                });
+            }
+
+            if (el.tagName === 'A' && el.hasAttribute('href')) {
+                recorded.add(el);
+                dedup(links, {
+                    index: links.length,
+                    text: clip(el.innerText, 80),
+                    href: el.href,
+                    id: el.id || null,
+                    class: el.className || null,
+                    aria_label: clip(el.getAttribute('aria-label'), 120) || null,
+                    target: el.target || null,
+                    position: pos(),
+                    selector: generateSelector(el)
+                });
+            }
+
+            if (!skipClickable && !recorded.has(el) && el.tagName !== 'BUTTON' && el.tagName !== 'A' && el.matches(CLICKABLE)) {
+                clickable_elements.push({
+                    index: clickable_elements.length,
+                    tag: el.tagName.toLowerCase(),
+                    text: clip(el.innerText, 80),
+                    id: el.id || null,
+                    class: el.className || null,
+                    role: el.getAttribute('role') || null,
+                    aria_label: clip(el.getAttribute('aria-label'), 120) || null,
+                    has_onclick: el.hasAttribute('onclick'),
+                    position: pos(),
+                    selector: generateSelector(el)
+                });
+            }
+        }
+
+        // --- Visible text ---
+        // A TreeWalker prunes script/style/hidden subtrees at the branch, so
+        // hidden content is never visited. The old approach deep-cloned the
+        // whole body and ran innerText on the clone — a full copy plus a
+        // layout pass, discarded immediately. Collection stops once the
+        // 5000-char cap is reached.
+        const SKIP_TAGS = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'IFRAME']);
+        let visible_text = '';
+        const walker = document.createTreeWalker(
+            document.body,
+            NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT,
+            {
+                acceptNode(node) {
+                    if (node.nodeType === Node.ELEMENT_NODE) {
+                        if (SKIP_TAGS.has(node.tagName)) return NodeFilter.FILTER_REJECT;
+                        // offsetParent is null for display:none subtrees, but
+                        // also for fixed-position elements — only pay for
+                        // getComputedStyle in that ambiguous case
+                        if (node.offsetParent === null &&
+                            getComputedStyle(node).position !== 'fixed') {
+                            return NodeFilter.FILTER_REJECT;
+                        }
+                        return NodeFilter.FILTER_SKIP;
+                    }
+                    return NodeFilter.FILTER_ACCEPT;
+                }
+            }
+        );
+        let textNode;
+        while (visible_text.length < 5000 && (textNode = walker.nextNode())) {
+            const t = textNode.nodeValue.trim();
+            if (t) visible_text += (visible_text ? ' ' : '') + t;
+        }
+        visible_text = visible_text.substring(0, 5000);
+
+        const categories = [buttons, text_inputs, select_dropdowns, links,
+                            clickable_elements, form_elements];
+        for (const arr of categories) {
+            if (maxEl > 0 && arr.length > maxEl) arr.length = maxEl;
+            if (!withPos) {
+                for (const r of arr) delete r.position;
+            }
+        }
+
+        return {
+            buttons: buttons,
+            text_inputs: text_inputs,
+            select_dropdowns: select_dropdowns,
+            links: links,
+            clickable_elements: clickable_elements,
+            form_elements: form_elements,
+            visible_text: visible_text
+        };
+    };
+
+    let done = false;
+    const finish = () => {
+        if (!done) { done = true; resolve(snapshot()); }
+    };
+    requestAnimationFrame(finish);
+    setTimeout(finish, 50);
+})
+"""
+
+_OBSERVE_JS = (_OBSERVE_JS
+               .replace("__BUTTONISH__", _BUTTON_SELECTOR)
+               .replace("__TEXT_INPUT__", _TEXT_INPUT_SELECTOR)
+               .replace("__CLICKABLE__", _CLICKABLE_SELECTOR)
+               .replace("__COMBINED__", _COMBINED_SELECTOR))
+
+# Installed once per page so subsequent observations only ship a tiny call
+_OBSERVE_INSTALL_JS = "window.__observe = " + _OBSERVE_JS.strip() + ";"
+
+
+def _url_pattern(url: str) -> str:
+    """Reduce a URL to host plus first path segment (its page family)."""
+    stripped = url.split("//", 1)[-1].split("?", 1)[0]
+    return "/".join(stripped.split("/")[:2])
+
+
 class DOMObserver:
     """Observes and extracts interactive elements from the DOM."""
-    
+
     def __init__(self, page: Page):
         """
         Initialize the DOM Observer.
-        
+
         Args:
             page: Playwright Page object
         """
         self.page = page
-        
-    def observe(self) -> Dict[str, Any]:
+        self._last_state: Optional[Dict[str, Any]] = None
+        self._cache_url: Optional[str] = None
+        self._cache_opts: Optional[Dict[str, Any]] = None
+        self._cache_ts: float = 0.0
+        # URL patterns observed to have zero clickable_elements; later
+        # observations of the same family skip that selector branch
+        self._no_clickable_patterns: set = set()
+        try:
+            # Future navigations get the observer function pre-installed,
+            # so observe() only sends "window.__observe()" over the wire
+            self.page.add_init_script(_OBSERVE_INSTALL_JS)
+        except Exception as e:
+            logger.warning("Could not install observer init script: %s", e)
+
+    def observe(self, *, include_positions: bool = False,
+                max_elements: int = 500) -> Dict[str, Any]:
         """
         Main observation method that extracts the complete page state.
-        
+
+        Args:
+            include_positions: Attach x/y/width/height to each record.
+                Off by default — the planner never reads coordinates, and
+                they are the bulk of the per-element payload.
+            max_elements: Cap per category to bound pathological pages.
+
         Returns:
             Dictionary containing all observable page state information
         """
+        # Back-to-back callers (save_state then get_state_summary) reuse
+        # the last snapshot instead of re-extracting; 100ms is short
+        # enough that nothing meaningful changes on a settled page
+        pattern = _url_pattern(self.page.url)
+        opts = {"withPos": include_positions, "max": max_elements,
+                "skipClickable": pattern in self._no_clickable_patterns}
+        if (self._last_state is not None
+                and self._cache_url == self.page.url
+                and self._cache_opts == opts
+                and time.monotonic() - self._cache_ts < 0.1):
+            return self._last_state
+
         logger.info("Starting DOM observation...")
-        
+
+        extracted = self._run_observer_js(opts)
+
+        # No timestamp here: a wall-clock string would perturb every
+        # state hash and cache key downstream; the run log stamps records
         page_state = {
             "url": self.page.url,
             "title": self.page.title(),
-            "buttons": self._extract_buttons(),
-            "text_inputs": self._extract_text_inputs(),
-            "select_dropdowns": self._extract_dropdowns(),
-            "links": self._extract_links(),
-            "clickable_elements": self._extract_clickable_elements(),
-            "form_elements": self._extract_forms(),
-            "visible_text": self._extract_visible_text(),
-            "timestamp": self._get_timestamp()
+            **extracted
         }
-        
-        logger.info(f"Observation complete. Found {len(page_state['buttons'])} buttons, "
-                   f"{len(page_state['text_inputs'])} inputs, "
-                   f"{len(page_state['links'])} links")
-        
+        if not opts["skipClickable"] and not page_state["clickable_elements"]:
+            self._no_clickable_patterns.add(pattern)
+
+        self._last_state = page_state
+        self._cache_url = page_state["url"]
+        self._cache_opts = opts
+        self._cache_ts = time.monotonic()
+
+        logger.info("Observation complete. Found %d buttons, %d inputs, %d links",
+                    len(page_state['buttons']), len(page_state['text_inputs']),
+                    len(page_state['links']))
+
         return page_state
-    
+
+    def _run_observer_js(self, opts: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run the fused extraction script in one round-trip.
+
+        Prefers the pre-installed window.__observe function (tiny call);
+        falls back to sending the full source for pages that were loaded
+        before the init script was registered.
+        """
+        result = self._safe_evaluate(
+            "(opts) => window.__observe ? window.__observe(opts) : null", opts)
+        if result is None:
+            result = self._safe_evaluate(_OBSERVE_JS, opts)
+        return result
+
+    def _safe_evaluate(self, js: str, arg: Any = None) -> Any:
+        """
+        Evaluate with retries on timeout.
+
+        Timeouts are usually transient (the page is busy mid-navigation)
+        and retried with 50/150/450ms backoff. Anything else re-raises:
+        the old per-extractor handlers returned [] on every failure, which
+        callers couldn't tell apart from "page has no such elements" and
+        which silently hid real script errors.
+        """
+        delay = 0.05
+        for attempt in range(3):
+            try:
+                return self.page.evaluate(js, arg)
+            except PlaywrightTimeoutError:
+                if attempt == 2:
+                    raise
+                logger.warning("Observer evaluate timed out, retrying in %.2fs", delay)
+                time.sleep(delay)
+                delay *= 3
+
+    def observe_with_frames(self) -> Dict[str, Any]:
+        """
+        Observe the main frame and merge in elements from child iframes.
+
+        Booking widgets are often embedded in iframes that the main-frame
+        walk can't see. Child frames are evaluated serially (the sync API
+        has no gather); merged records carry a "frame" field with the
+        frame URL so downstream code can tell them apart.
+
+        Returns:
+            Page state dictionary with child-frame elements appended
+        """
+        state = self.observe()
+        # Copy before merging so the cached snapshot isn't mutated
+        merged = {k: (list(v) if isinstance(v, list) else v)
+                  for k, v in state.items()}
+
+        for frame in self.page.frames:
+            if frame is self.page.main_frame:
+                continue
+            try:
+                extracted = frame.evaluate(_OBSERVE_JS)
+            except Exception as e:
+                logger.warning("Could not observe frame %s: %s", frame.url, e)
+                continue
+            for key in ("buttons", "text_inputs", "select_dropdowns", "links",
+                        "clickable_elements", "form_elements"):
+                for record in extracted.get(key, []):
+                    record["frame"] = frame.url
+                    merged[key].append(record)
+
+        return merged
+
+    def _category(self, key: str) -> List[Dict[str, Any]]:
+        """Return one category from the last observation (observing if needed)."""
+        state = self._last_state
+        if state is None:
+            state = self.observe()
+        return state[key]
+
     def _extract_buttons(self) -> List[Dict[str, Any]]:
         """Extract all button elements from the page."""
-        buttons = []
-        
-        # JavaScript to extract button information
-        js_code = """
-        () => {
-            const buttons = [];
-            const selectors = [
-                'button',
-                'input[type="button"]',
-                'input[type="submit"]',
-                '[role="button"]',
-                'a.btn', 
-                '.button'
-            ];
-            
-            const elements = document.querySelectorAll(selectors.join(','));
-            
-            elements.forEach((el, index) => {
-                if (el.offsetParent !== null) { // Check if visible
-                    const rect = el.getBoundingClientRect();
-                    buttons.push({
-                        index: index,
-                        tag: el.tagName.toLowerCase(),
-                        text: el.innerText?.trim() || el.value || '',
-                        id: el.id || null,
-                        class: el.className || null,
-                        name: el.name || null,
-                        type: el.type || null,
-                        aria_label: el.getAttribute('aria-label') || null,
-                        data_attributes: Array.from(el.attributes)
-                            .filter(attr => attr.name.startsWith('data-'))
-                            .reduce((acc, attr) => {
-                                acc[attr.name] = attr.value;
-                                return acc;
-                            }, {}),
-                        is_visible: true,
-                        is_enabled: !el.disabled,
-                        position: {
-                            x: rect.x,
-                            y: rect.y,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        selector: generateSelector(el)
-                    });
-                }
-            });
-            
-            function generateSelector(el) {
-                if (el.id) return `#${el.id}`;
-                if (el.name) return `[name="${el.name}"]`;
-                
-                let path = [];
-                while (el.parentElement) {
-                    let selector = el.tagName.toLowerCase();
-                    if (el.className) {
-                        selector += '.' + el.className.trim().split(/\\s+/).join('.');
-                    }
-                    path.unshift(selector);
-                    el = el.parentElement;
-                    if (path.length > 3) break; // Limit depth
-                }
-                return path.join(' > ');
-            }
-            
-            return buttons;
-        }
-        """
-        
-        try:
-            buttons = self.page.evaluate(js_code)
-        except Exception as e:
-            logger.error(f"Error extracting buttons: {e}")
-            buttons = []
-            
-        return buttons
-    
+        return self._category("buttons")
+
     def _extract_text_inputs(self) -> List[Dict[str, Any]]:
         """Extract all text input elements from the page."""
-        js_code = """
-        () => {
-            const inputs = [];
-            const selectors = [
-                'input[type="text"]',
-                'input[type="email"]',
-                'input[type="tel"]',
-                'input[type="number"]',
-                'input[type="search"]',
-                'input[type="date"]',
-                'input[type="time"]',
-                'input:not([type])',
-                'textarea'
-            ];
-            
-            const elements = document.querySelectorAll(selectors.join(','));
-            
-            elements.forEach((el, index) => {
-                if (el.offsetParent !== null) {
-                    const rect = el.getBoundingClientRect();
-                    inputs.push({
-                        index: index,
-                        tag: el.tagName.toLowerCase(),
-                        type: el.type || 'text',
-                        id: el.id || null,
-                        name: el.name || null,
-                        placeholder: el.placeholder || null,
-                        value: el.value || '',
-                        class: el.className || null,
-                        aria_label: el.getAttribute('aria-label') || null,
-                        label: findLabel(el),
-                        is_required: el.required || false,
-                        is_enabled: !el.disabled,
-                        max_length: el.maxLength > 0 ? el.maxLength : null,
-                        pattern: el.pattern || null,
-                        position: {
-                            x: rect.x,
-                            y: rect.y,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        selector: generateSelector(el)
-                    });
-                }
-            });
-            
-            function findLabel(el) {
-                // Try to find associated label
-                if (el.id) {
-                    const label = document.querySelector(`label[for="${el.id}"]`);
-                    if (label) return label.innerText.trim();
-                }
-                
-                // Check if input is inside a label
-                const parentLabel = el.closest('label');
-                if (parentLabel) return parentLabel.innerText.trim();
-                
-                return null;
-            }
-            
-            function generateSelector(el) {
-                if (el.id) return `#${el.id}`;
-                if (el.name) return `[name="${el.name}"]`;
-                
-                let path = [];
-                let current = el;
-                while (current.parentElement) {
-                    let selector = current.tagName.toLowerCase();
-                    if (current.className) {
-                        selector += '.' + current.className.trim().split(/\\s+/).join('.');
-                    }
-                    path.unshift(selector);
-                    current = current.parentElement;
-                    if (path.length > 3) break;
-                }
-                return path.join(' > ');
-            }
-            
-            return inputs;
-        }
-        """
-        
-        try:
-            inputs = self.page.evaluate(js_code)
-        except Exception as e:
-            logger.error(f"Error extracting text inputs: {e}")
-            inputs = []
-            
-        return inputs
-    
+        return self._category("text_inputs")
+
     def _extract_dropdowns(self) -> List[Dict[str, Any]]:
         """Extract all select dropdown elements from the page."""
-        js_code = """
-        () => {
-            const dropdowns = [];
-            const selects = document.querySelectorAll('select');
-            
-            selects.forEach((el, index) => {
-                if (el.offsetParent !== null) {
-                    const rect = el.getBoundingClientRect();
-                    const options = Array.from(el.options).map(opt => ({
-                        text: opt.text,
-                        value: opt.value,
-                        selected: opt.selected
-                    }));
-                    
-                    dropdowns.push({
-                        index: index,
-                        id: el.id || null,
-                        name: el.name || null,
-                        class: el.className || null,
-                        label: findLabel(el),
-                        current_value: el.value,
-                        options: options,
-                        is_multiple: el.multiple,
-                        is_enabled: !el.disabled,
-                        position: {
-                            x: rect.x,
-                            y: rect.y,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        selector: generateSelector(el)
-                    });
-                }
-            });
-            
-            function findLabel(el) {
-                if (el.id) {
-                    const label = document.querySelector(`label[for="${el.id}"]`);
-                    if (label) return label.innerText.trim();
-                }
-                const parentLabel = el.closest('label');
-                if (parentLabel) return parentLabel.innerText.trim();
-                return null;
-            }
-            
-            function generateSelector(el) {
-                if (el.id) return `#${el.id}`;
-                if (el.name) return `[name="${el.name}"]`;
-                return `select:nth-of-type(${index + 1})`;
-            }
-            
-            return dropdowns;
-        }
-        """
-        
-        try:
-            dropdowns = self.page.evaluate(js_code)
-        except Exception as e:
-            logger.error(f"Error extracting dropdowns: {e}")
-            dropdowns = []
-            
-        return dropdowns
-    
+        return self._category("select_dropdowns")
+
     def _extract_links(self) -> List[Dict[str, Any]]:
         """Extract all link elements from the page."""
-        js_code = """
-        () => {
-            const links = [];
-            const elements = document.querySelectorAll('a[href]');
-            
-            elements.forEach((el, index) => {
-                if (el.offsetParent !== null) {
-                    const rect = el.getBoundingClientRect();
-                    links.push({
-                        index: index,
-                        text: el.innerText?.trim() || '',
-                        href: el.href,
-                        id: el.id || null,
-                        class: el.className || null,
-                        aria_label: el.getAttribute('aria-label') || null,
-                        target: el.target || null,
-                        position: {
-                            x: rect.x,
-                            y: rect.y,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        selector: generateSelector(el)
-                    });
-                }
-            });
-            
-            function generateSelector(el) {
-                if (el.id) return `#${el.id}`;
-                return `a[href="${el.getAttribute('href')}"]`;
-            }
-            
-            return links;
-        }
-        """
-        
-        try:
-            links = self.page.evaluate(js_code)
-        except Exception as e:
-            logger.error(f"Error extracting links: {e}")
-            links = []
-            
-        return links
-    
+        return self._category("links")
+
     def _extract_clickable_elements(self) -> List[Dict[str, Any]]:
         """Extract other clickable elements (divs, spans with onclick, etc.)."""
-        js_code = """
-        () => {
-            const clickables = [];
-            const elements = document.querySelectorAll('[onclick], [role="tab"], [role="menuitem"]');
-            
-            elements.forEach((el, index) => {
-                if (el.offsetParent !== null && el.tagName !== 'BUTTON' && el.tagName !== 'A') {
-                    const rect = el.getBoundingClientRect();
-                    clickables.push({
-                        index: index,
-                        tag: el.tagName.toLowerCase(),
-                        text: el.innerText?.trim() || '',
-                        id: el.id || null,
-                        class: el.className || null,
-                        role: el.getAttribute('role') || null,
-                        aria_label: el.getAttribute('aria-label') || null,
-                        has_onclick: el.hasAttribute('onclick'),
-                        position: {
-                            x: rect.x,
-                            y: rect.y,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        selector: generateSelector(el)
-                    });
-                }
-            });
-            
-            function generateSelector(el) {
-                if (el.id) return `#${el.id}`;
-                let selector = el.tagName.toLowerCase();
-                if (el.className) {
-                    selector += '.' + el.className.trim().split(/\\s+/).join('.');
-                }
-                return selector;
-            }
-            
-            return clickables;
-        }
-        """
-        
-        try:
-            clickables = self.page.evaluate(js_code)
-        except Exception as e:
-            logger.error(f"Error extracting clickable elements: {e}")
-            clickables = []
-            
-        return clickables
-    
+        return self._category("clickable_elements")
+
     def _extract_forms(self) -> List[Dict[str, Any]]:
         """Extract form elements and their structure."""
-        js_code = """
-        () => {
-            const forms = [];
-            const formElements = document.querySelectorAll('form');
-            
-            formElements.forEach((form, index) => {
-                const inputs = Array.from(form.querySelectorAll('input, textarea, select')).map(el => ({
-                    type: el.type || el.tagName.toLowerCase(),
-                    name: el.name,
-                    id: el.id,
-                    required: el.required
-                }));
-                
-                forms.push({
-                    index: index,
-                    id: form.id || null,
-                    name: form.name || null,
-                    action: form.action || null,
-                    method: form.method || null,
-                    inputs: inputs,
-                    selector: form.id ? `#${form.id}` : `form:nth-of-type(${index + 1})`
-                });
-            });
-            
-            return forms;
-        }
-        """
-        
-        try:
-            forms = self.page.evaluate(js_code)
-        except Exception as e:
-            logger.error(f"Error extracting forms: {e}")
-            forms = []
-            
-        return forms
-    
+        return self._category("form_elements")
+
     def _extract_visible_text(self) -> str:
         """Extract main visible text content from the page."""
-        js_code = """
-        () => {
-            // Get text from main content areas, excluding scripts, styles, etc.
-            const body = document.body;
-            const clone = body.cloneNode(true);
-            
-            // Remove script, style, and other non-content elements
-            const toRemove = clone.querySelectorAll('script, style, noscript, iframe');
-            toRemove.forEach(el => el.remove());
-            
-            return clone.innerText?.trim().substring(0, 5000) || ''; // Limit to 5000 chars
-        }
+        state = self._last_state
+        if state is None:
+            state = self.observe()
+        return state["visible_text"]
+
+    def _extract_visible_text_fast(self) -> str:
+        """
+        Extract visible text by parsing the page HTML with lxml in-process.
+
+        One page.content() round-trip replaces the in-browser text walk;
+        lxml's C parser does the rest locally, which wins when the text is
+        needed without a full observation. Falls back to the JS path when
+        lxml is unavailable or parsing fails. Unlike the walker this can't
+        see CSS-hidden text, so it may include slightly more content.
         """
-        
+        if lxml_html is None:
+            return self._extract_visible_text()
         try:
-            text = self.page.evaluate(js_code)
+            root = lxml_html.fromstring(self.page.content())
+            lxml_etree.strip_elements(root, 'script', 'style', 'noscript',
+                                      'iframe', with_tail=False)
+            return ' '.join(root.text_content().split())[:5000]
         except Exception as e:
-            logger.error(f"Error extracting visible text: {e}")
-            text = ""
-            
-        return text
-    
-    def _get_timestamp(self) -> str:
-        """Get current timestamp."""
-        from datetime import datetime
-        return datetime.now().isoformat()
-    
-    def save_state(self, filepath: str = "page_state.json") -> None:
+            logger.warning("lxml text extraction failed, using JS path: %s", e)
+            return self._extract_visible_text()
+
+    # The page serializes once and the text goes straight to disk; without
+    # this, Playwright deserializes the state into Python objects only for
+    # json.dump to re-serialize them immediately.
+    _STRINGIFY_JS = (
+        "() => Promise.resolve(window.__observe ? window.__observe() : null)"
+        ".then(s => s && JSON.stringify("
+        "Object.assign({url: location.href, title: document.title}, s)))"
+    )
+
+    def save_state(self, filepath: str = "page_state.json", *,
+                   pretty: bool = False) -> None:
         """
         Observe the current state and save it to a JSON file.
-        
+
         Args:
             filepath: Path where the JSON file should be saved
+            pretty: Indent the output for human reading. Off by default —
+                programmatic consumers never look at the whitespace, and
+                indenting roughly doubles bytes and serialization time.
         """
-        state = self.observe()
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
-        
-        logger.info(f"Page state saved to {filepath}")
-    
-    def get_state_summary(self) -> str:
+        if pretty:
+            state = self.observe()
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2, ensure_ascii=False)
+            logger.info("Page state saved to %s", filepath)
+            return
+
+        try:
+            json_text = self.page.evaluate(self._STRINGIFY_JS)
+        except Exception:
+            json_text = None
+
+        if json_text is not None:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(json_text)
+        else:
+            # Observer not installed on this page yet — full round-trip
+            state = self.observe()
+            if orjson is not None:
+                with open(filepath, 'wb') as f:
+                    f.write(orjson.dumps(state))
+            else:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    json.dump(state, f, ensure_ascii=False)
+
+        logger.info("Page state saved to %s", filepath)
+
+    def get_state_summary(self, state: Optional[Dict[str, Any]] = None) -> str:
         """
         Get a human-readable summary of the current page state.
-        
+
+        Args:
+            state: Pre-computed observation to summarize; observes if omitted
+
         Returns:
             String summary of the page state
         """
-        state = self.observe()
-        
+        if state is None:
+            state = self.observe()
+
         summary = f"""
 Page State Summary
 ==================
@@ -483,8 +703,6 @@ Interactive Elements:
 - Links: {len(state['links'])}
 - Other Clickable: {len(state['clickable_elements'])}
 - Forms: {len(state['form_elements'])}
-
-Timestamp: {state['timestamp']}
 """
         return summary
 
@@ -492,22 +710,22 @@ Timestamp: {state['timestamp']}
 # Example usage
 if __name__ == "__main__":
     from playwright.sync_api import sync_playwright
-    
+
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
         page = browser.new_page()
-        
+
         # Navigate to OpenTable (example)
         page.goto("https://www.opentable.com")
         page.wait_for_load_state("networkidle")
-        
+
         # Create observer and extract state
         observer = DOMObserver(page)
-        
+
         # Print summary
         print(observer.get_state_summary())
-        
+
         # Save full state to JSON
         observer.save_state("opentable_state.json")
-        
-        browser.close()
\ No newline at end of file
+
+        browser.close()
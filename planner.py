@@ -4,16 +4,92 @@ planner.py - Planning Agent for Browser Automation
 This module uses an LLM to plan the next action based on the current page state.
 """
 
+import hashlib
 import json
 import logging
+import re
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 import google.generativeai as genai
 import os
 
-logging.basicConfig(level=logging.INFO)
+try:
+    import orjson  # Optional: C-speed JSON for the per-call prompt payloads
+except ImportError:
+    orjson = None
+
+try:
+    import fastjsonschema  # Optional: compiled plan-schema validation
+except ImportError:
+    fastjsonschema = None
+
 logger = logging.getLogger(__name__)
 
 
+def _loads(text):
+    """Parse JSON text with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _dumps(obj, sort_keys=False):
+    """Compact JSON text with orjson when available.
+
+    Compact output matters twice here: serialization is off the critical
+    path, and indentation would inflate the prompt by 20-30% in tokens.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode()
+    return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"))
+
+
+# Matches a whole response wrapped in a markdown code fence (with or
+# without a "json" tag, any case); group 1 is the payload
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*\n?(.*?)\n?```\s*$",
+                       re.IGNORECASE | re.DOTALL)
+
+
+# GenerativeModel instances shared across Planner constructions: each
+# one owns an HTTP session, so reuse keeps the warmed connection alive
+# instead of paying TLS setup per Planner (worker pools, tests)
+_MODEL_CACHE: Dict[Any, genai.GenerativeModel] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+_CONFIGURED_API_KEY: Optional[str] = None
+
+
+# Mirrors the schema spelled out in SYSTEM_PROMPT, including the
+# decision-dependent required fields
+PLAN_SCHEMA = {
+    "type": "object",
+    "required": ["decision", "reason"],
+    "properties": {
+        "decision": {"enum": ["act", "ask", "stop"]},
+        "reason": {"type": "string"},
+        "candidates": {"type": "array", "minItems": 2, "maxItems": 4},
+        "chosen_action": {"type": "object", "required": ["type", "target"]},
+        "question": {"type": "object"},
+        "stop_state": {"type": "object"},
+    },
+    "oneOf": [
+        {"properties": {"decision": {"const": "act"}},
+         "required": ["candidates", "chosen_action"]},
+        {"properties": {"decision": {"const": "ask"}},
+         "required": ["question"]},
+        {"properties": {"decision": {"const": "stop"}},
+         "required": ["stop_state"]},
+    ],
+}
+
+# Compiled once at import into a straight-line function; per-plan
+# validation then costs a single call instead of a chain of dict probes
+_PLAN_VALIDATOR = (fastjsonschema.compile(PLAN_SCHEMA)
+                   if fastjsonschema is not None else None)
+
+
 class Planner:
     """Plans the next action using an LLM based on page state."""
     
@@ -30,6 +106,11 @@ class Planner:
         ],
         "stop_at_review": True
     }
+
+    # Near-identical page states (loader variants, reshuffled cards) should
+    # reuse a prior plan even when the exact digest differs
+    SEMANTIC_CACHE_THRESHOLD = 0.92
+    SEMANTIC_CACHE_SIZE = 64
     
     SYSTEM_PROMPT = """You are the PLANNER for a browser automation system. Your job is to decide the NEXT best action to accomplish the user's task given the current PageState from an observer.
 
@@ -132,20 +213,65 @@ Important:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY must be provided or set as environment variable")
         
-        genai.configure(api_key=self.api_key)
         self.model_name = model_name
-        self.model = genai.GenerativeModel(
-            model_name=model_name,
-            generation_config={
-                "temperature": 0.1,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-            }
-        )
+        self._generation_config = {
+            "temperature": 0.1,
+            "top_p": 0.95,
+            "top_k": 40,
+            "max_output_tokens": 8192,
+        }
+        # JSON mode: the model decodes under a JSON grammar, so the
+        # response is always parseable and never fence-wrapped.
+        # Feature-detected because older SDKs reject unknown config keys.
+        self._json_mode = "response_mime_type" in getattr(
+            genai.types.GenerationConfig, "__dataclass_fields__", {})
+        if self._json_mode:
+            self._generation_config["response_mime_type"] = "application/json"
+        global _CONFIGURED_API_KEY
+        with _MODEL_CACHE_LOCK:
+            # configure() is process-global; only re-run it when the key
+            # actually changes
+            if _CONFIGURED_API_KEY != self.api_key:
+                genai.configure(api_key=self.api_key)
+                _CONFIGURED_API_KEY = self.api_key
+            model_key = (self.api_key, model_name,
+                         tuple(sorted(self._generation_config.items())))
+            model = _MODEL_CACHE.get(model_key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    model_name=model_name,
+                    generation_config=self._generation_config
+                )
+                _MODEL_CACHE[model_key] = model
+            self.model = model
         self.memory: List[Dict[str, Any]] = []
-        
-        logger.info(f"Planner initialized with model: {model_name}")
+        # The default constraints never change, so the common call (no
+        # custom constraints) reuses one immutable view and one
+        # pre-serialized dump instead of re-merging and re-dumping
+        self._default_constraints = types.MappingProxyType(dict(self.CONSTRAINTS))
+        self._default_constraints_json = _dumps(dict(self.CONSTRAINTS),
+                                                sort_keys=True)
+        # Plan responses keyed by a digest of (task, constraints, simplified
+        # page state); a hit skips the Gemini round-trip entirely
+        self._plan_cache: Dict[str, str] = {}
+        # Provenance of the most recent plan() result, so the loop can
+        # evict a cached plan that demonstrably didn't work (see
+        # invalidate_last_plan)
+        self._last_cache_key: Optional[str] = None
+        self._last_plan_text: Optional[str] = None
+        # Pre-built static prompt prefixes keyed by (task, constraints)
+        self._prefix_cache: Dict[Any, str] = {}
+        # (embedding, plan_json) pairs for near-match lookups; embeddings
+        # are disabled for the rest of the run on the first API failure
+        self._semantic_cache: List[Any] = []
+        self._embeddings_ok = True
+        # Explicit prompt cache for the static system prompt: the ~800
+        # tokens are uploaded once and referenced by handle on every call
+        # instead of being re-billed and re-prefilled each turn
+        self._cached_model = None
+        self.refresh_cache()
+
+        logger.info("Planner initialized with model: %s", model_name)
     
     def plan(
         self,
@@ -164,145 +290,437 @@ Important:
         Returns:
             Plan dictionary matching the JSON schema
         """
-        # Merge constraints
-        constraints = {**self.CONSTRAINTS}
+        # Merge constraints; the no-custom-constraints fast path skips
+        # both the dict copy and the serialization
         if custom_constraints:
-            constraints.update(custom_constraints)
-        
-        # Build the input payload
-        planner_input = {
-            "task": task,
-            "constraints": constraints,
-            "memory": self._get_memory_summary(),
-            "page_state": self._simplify_page_state(page_state)
-        }
-        
-        # Create the prompt
-        user_prompt = f"""USER INPUT:
-{json.dumps(planner_input, indent=2)}
+            constraints_json = _dumps({**self.CONSTRAINTS, **custom_constraints},
+                                      sort_keys=True)
+        else:
+            constraints_json = self._default_constraints_json
+
+        simplified_state = self._simplify_page_state(page_state)
+
+        # Cache lookup: identical (task, constraints, simplified state) means
+        # the page is effectively unchanged (loader flicker, retry after a
+        # no-op action), so the previous plan is still the right answer.
+        # Memory is deliberately left out of the key — including it would
+        # defeat the cache on exactly those retries. The simplified state
+        # already excludes timestamps and positions, so it hashes stably.
+        cache_key = hashlib.sha256("\0".join(
+            (task, constraints_json, _dumps(simplified_state, sort_keys=True))
+        ).encode()).hexdigest()
+
+        cached = self._plan_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Plan cache hit, skipping LLM call")
+            self._last_cache_key = cache_key
+            self._last_plan_text = cached
+            return self._use_cached_plan(cached, page_state)
+
+        # Semantic layer: an embedding lookup costs far less than a
+        # generation, and near-identical states (same picker, cards in a
+        # different order) deserve the same plan. Skipped under custom
+        # constraints, which can legitimately change the right answer.
+        embedding = None
+        if not custom_constraints:
+            embedding = self._embed_state(task, simplified_state)
+            if embedding is not None and self._semantic_cache:
+                best_text, best_sim = None, 0.0
+                for vec, plan_text in self._semantic_cache:
+                    sim = self._cosine(embedding, vec)
+                    if sim > best_sim:
+                        best_text, best_sim = plan_text, sim
+                if best_sim >= self.SEMANTIC_CACHE_THRESHOLD:
+                    logger.info("Semantic plan cache hit (similarity %.3f)", best_sim)
+                    self._last_cache_key = cache_key
+                    self._last_plan_text = best_text
+                    return self._use_cached_plan(best_text, page_state)
+
+        static_prefix = self._build_prefix(task, constraints_json)
+
+        variable_tail = f"""MEMORY:
+{_dumps(self._get_memory_summary())}
+
+PAGE STATE:
+{_dumps(simplified_state)}
 
 Analyze the current page state and decide the next action. Output ONLY valid JSON matching the schema."""
-        
+
         # Call the LLM
         try:
             logger.info("Sending request to Gemini API...")
-            response = self.model.generate_content([
-                self.SYSTEM_PROMPT,
-                user_prompt
-            ])
-            
-            # Extract and parse the response
-            response_text = response.text.strip()
-            
-            # Remove markdown code blocks if present
-            if response_text.startswith("```json"):
-                response_text = response_text.split("```json")[1]
-            if response_text.startswith("```"):
-                response_text = response_text.split("```")[1]
-            if response_text.endswith("```"):
-                response_text = response_text.rsplit("```", 1)[0]
-            
-            response_text = response_text.strip()
-            
-            # Parse JSON
-            plan = json.loads(response_text)
-            
+            model = self._cached_model or self.model
+            try:
+                response = model.generate_content([static_prefix, variable_tail])
+            except Exception as e:
+                if model is not self._cached_model:
+                    raise
+                # Most likely the cache TTL lapsed — rebuild it (or fall
+                # back to the plain model) and retry once
+                logger.warning("Cached-content call failed (%s), refreshing cache", e)
+                self.refresh_cache()
+                static_prefix = self._build_prefix(task, constraints_json)
+                model = self._cached_model or self.model
+                response = model.generate_content([static_prefix, variable_tail])
+
+            usage = getattr(response, "usage_metadata", None)
+            cached_tokens = getattr(usage, "cached_content_token_count", None)
+            if cached_tokens:
+                logger.info("Implicit cache served %s prompt tokens", cached_tokens)
+
+            # Extract and parse the response; fence stripping is only
+            # needed when the model isn't constrained to JSON output
+            response_text = (response.text if self._json_mode
+                             else self._strip_fences(response.text))
+
+            # Parse JSON. Only parse failures get the invalid-JSON label:
+            # response.text above and _validate_plan below raise their own
+            # ValueErrors that belong to the generic handler.
+            try:
+                plan = _loads(response_text)
+            except ValueError as e:
+                logger.error("Failed to parse JSON response: %s", e)
+                logger.error("Response text: %s", response_text)
+                raise ValueError(f"LLM returned invalid JSON: {e}") from e
+
             # Validate the plan
             self._validate_plan(plan)
-            
-            # Store in memory if it's an action
-            if plan.get("decision") == "act" and plan.get("chosen_action"):
-                self.memory.append({
-                    "action": plan["chosen_action"],
-                    "reason": plan["reason"],
-                    "page_url": page_state.get("url", "unknown")
-                })
-            
-            logger.info(f"Plan generated: decision={plan['decision']}, reason={plan['reason'][:100]}...")
+
+            self._store_plan(cache_key, embedding, response_text, plan,
+                             page_state)
+
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Plan generated: decision=%s, reason=%.100s...",
+                            plan['decision'], plan['reason'])
             return plan
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {e}")
-            logger.error(f"Response text: {response_text}")
-            raise ValueError(f"LLM returned invalid JSON: {e}")
         except Exception as e:
-            logger.error(f"Error generating plan: {e}")
+            logger.error("Error generating plan: %s", e)
             raise
     
+    def plan_many(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Plan several independent requests concurrently.
+
+        Each entry is a dict with "task" and "page_state" (and optionally
+        "custom_constraints"). Results come back in input order. A single
+        request takes the direct path so its latency is unchanged; larger
+        batches overlap their Gemini round-trips in a small thread pool —
+        plan() is network-bound, so concurrency is where the win is. All
+        calls share the process-level plan/semantic caches.
+
+        Args:
+            requests: List of request dicts as described above
+
+        Returns:
+            List of plan dictionaries, one per request
+        """
+        if len(requests) == 1:
+            r = requests[0]
+            return [self.plan(r["task"], r["page_state"],
+                              r.get("custom_constraints"))]
+
+        with ThreadPoolExecutor(max_workers=min(8, len(requests))) as pool:
+            futures = [
+                pool.submit(self.plan, r["task"], r["page_state"],
+                            r.get("custom_constraints"))
+                for r in requests
+            ]
+            return [f.result() for f in futures]
+
+    def plan_stream(self, task: str, page_state: Dict[str, Any]):
+        """
+        Stream a plan, yielding (stage, payload) tuples as it arrives.
+
+        Stages, in order:
+            "decision" — {"decision": ...} as soon as the field streams in
+            "action"   — {"type", "target"} once chosen_action.target is
+                         complete, so a caller can start warming selectors
+            "final"    — the full validated plan dict (always emitted)
+
+        Partial stages are sniffed from the token buffer with regexes
+        rather than an incremental JSON parser; the authoritative parse
+        and validation still happen on the complete response, exactly as
+        in plan(). Cache hits skip straight to "final".
+        """
+        constraints_json = self._default_constraints_json
+        simplified_state = self._simplify_page_state(page_state)
+
+        cache_key = hashlib.sha256("\0".join(
+            (task, constraints_json, _dumps(simplified_state, sort_keys=True))
+        ).encode()).hexdigest()
+        cached = self._plan_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Plan cache hit, skipping LLM call")
+            self._last_cache_key = cache_key
+            self._last_plan_text = cached
+            yield "final", self._use_cached_plan(cached, page_state)
+            return
+
+        static_prefix = self._build_prefix(task, constraints_json)
+        variable_tail = f"""MEMORY:
+{_dumps(self._get_memory_summary())}
+
+PAGE STATE:
+{_dumps(simplified_state)}
+
+Analyze the current page state and decide the next action. Output ONLY valid JSON matching the schema."""
+
+        model = self._cached_model or self.model
+        try:
+            response = model.generate_content([static_prefix, variable_tail],
+                                              stream=True)
+        except Exception as e:
+            if model is not self._cached_model:
+                raise
+            logger.warning("Cached-content call failed (%s), refreshing cache", e)
+            self.refresh_cache()
+            static_prefix = self._build_prefix(task, constraints_json)
+            model = self._cached_model or self.model
+            response = model.generate_content([static_prefix, variable_tail],
+                                              stream=True)
+
+        buffer = []
+        seen_decision = seen_action = False
+        for chunk in response:
+            buffer.append(chunk.text)
+            # Regex sniffing is cheap relative to token arrival, and only
+            # runs until each partial stage has fired once
+            if not seen_decision or not seen_action:
+                text = "".join(buffer)
+                if not seen_decision:
+                    m = self._DECISION_RE.search(text)
+                    if m:
+                        seen_decision = True
+                        yield "decision", {"decision": m.group(1)}
+                if not seen_action:
+                    m = self._ACTION_RE.search(text)
+                    if m:
+                        try:
+                            target = _loads(m.group(2))
+                        except ValueError:
+                            continue
+                        seen_action = True
+                        yield "action", {"type": m.group(1), "target": target}
+
+        full_text = "".join(buffer)
+        response_text = (full_text if self._json_mode
+                         else self._strip_fences(full_text))
+        plan = _loads(response_text)
+        self._validate_plan(plan)
+        self._store_plan(cache_key, None, response_text, plan, page_state)
+        yield "final", plan
+
+    # The target object is flat per the schema, so a bracket-free body
+    # match is enough to know it streamed in completely
+    _DECISION_RE = re.compile(r'"decision"\s*:\s*"(act|ask|stop)"')
+    _ACTION_RE = re.compile(
+        r'"chosen_action"\s*:\s*\{\s*"type"\s*:\s*"(\w+)"\s*,\s*'
+        r'"target"\s*:\s*(\{[^{}]*\})')
+
+    @staticmethod
+    def _strip_fences(text: str) -> str:
+        """Strip a markdown code fence from around the model's JSON."""
+        m = _FENCE_RE.match(text)
+        return m.group(1).strip() if m else text.strip()
+
+    def _store_plan(self, cache_key: str, embedding: Optional[List[float]],
+                    response_text: str, plan: Dict[str, Any],
+                    page_state: Dict[str, Any]) -> None:
+        """Record a validated plan in the caches and action memory.
+
+        Only validated responses are cached; storing the JSON text (not
+        the dict) keeps later mutations from poisoning the cache.
+        """
+        self._plan_cache[cache_key] = response_text
+        self._last_cache_key = cache_key
+        self._last_plan_text = response_text
+        if embedding is not None:
+            self._semantic_cache.append((embedding, response_text))
+            if len(self._semantic_cache) > self.SEMANTIC_CACHE_SIZE:
+                del self._semantic_cache[0]
+        if plan.get("decision") == "act" and plan.get("chosen_action"):
+            self.append_memory({
+                "action": plan["chosen_action"],
+                "reason": plan["reason"],
+                "page_url": page_state.get("url", "unknown")
+            })
+
+    def _use_cached_plan(self, plan_text: str, page_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Re-parse a cached plan and record its action in memory."""
+        plan = _loads(plan_text)
+        if plan.get("decision") == "act" and plan.get("chosen_action"):
+            self.append_memory({
+                "action": plan["chosen_action"],
+                "reason": plan["reason"],
+                "page_url": page_state.get("url", "unknown")
+            })
+        return plan
+
+    def _embed_state(self, task: str, simplified_state: Dict[str, Any]) -> Optional[List[float]]:
+        """Embed the planner-relevant gist of a page state, or None."""
+        if not self._embeddings_ok:
+            return None
+        doc = _dumps({
+            "task": task,
+            "url": simplified_state.get("url", ""),
+            "visible_text": simplified_state.get("visible_text_snippet", ""),
+            "buttons": [b.get("text") for b in
+                        simplified_state["elements"]["buttons"]],
+        }, sort_keys=True)
+        try:
+            result = genai.embed_content(model="models/text-embedding-004",
+                                         content=doc)
+            return result["embedding"]
+        except Exception as e:
+            logger.info("Embeddings unavailable, semantic cache disabled: %s", e)
+            self._embeddings_ok = False
+            return None
+
+    @staticmethod
+    def _cosine(a: List[float], b: List[float]) -> float:
+        """Cosine similarity of two equal-length vectors."""
+        dot = norm_a = norm_b = 0.0
+        for x, y in zip(a, b):
+            dot += x * y
+            norm_a += x * x
+            norm_b += y * y
+        if norm_a == 0.0 or norm_b == 0.0:
+            return 0.0
+        return dot / ((norm_a ** 0.5) * (norm_b ** 0.5))
+
+    def refresh_cache(self) -> None:
+        """Create (or recreate, after TTL expiry) the explicit prompt cache."""
+        self._cached_model = None
+        self._prefix_cache.clear()
+        try:
+            cached = genai.caching.CachedContent.create(
+                model=self.model_name,
+                system_instruction=self.SYSTEM_PROMPT,
+                ttl="3600s",
+            )
+            self._cached_model = genai.GenerativeModel.from_cached_content(
+                cached_content=cached,
+                generation_config=self._generation_config,
+            )
+            logger.info("Explicit prompt cache created for system prompt")
+        except Exception as e:
+            # Older google-generativeai releases have no caching module and
+            # some models reject small caches; implicit prefix caching
+            # still applies to the plain model, so this is only an info
+            logger.info("Explicit prompt caching unavailable: %s", e)
+
+    def _build_prefix(self, task: str, constraints_json: str) -> str:
+        """Stable prompt prefix; system prompt included only when it isn't
+        already served from the explicit cache.
+
+        Takes constraints pre-serialized (compact, sorted keys) so the
+        cached bytes are spliced straight into the prompt — the same
+        input always produces byte-identical prefixes.
+        """
+        include_system = self._cached_model is None
+        prefix_key = (include_system, task, constraints_json)
+        static_prefix = self._prefix_cache.get(prefix_key)
+        if static_prefix is None:
+            static_prefix = (
+                (f"{self.SYSTEM_PROMPT}\n\n" if include_system else "")
+                + f"CONSTRAINTS:\n{constraints_json}\n\n"
+                + f"TASK:\n{task}"
+            )
+            self._prefix_cache[prefix_key] = static_prefix
+        return static_prefix
+
+    # (key, default) pairs kept per element category — anything not
+    # listed here is dropped from the prompt
+    _BTN_FIELDS = (("text", ""), ("id", None), ("aria_label", None),
+                   ("selector", None), ("is_enabled", True), ("class", None))
+    _INPUT_FIELDS = (("type", "text"), ("id", None), ("name", None),
+                     ("placeholder", None), ("label", None),
+                     ("selector", None), ("is_enabled", True))
+    _DROPDOWN_FIELDS = (("id", None), ("name", None), ("label", None),
+                        ("selector", None), ("current_value", None))
+    _LINK_FIELDS = (("text", ""), ("href", ""), ("selector", None))
+
+    @staticmethod
+    def _pluck(record: Dict[str, Any], fields) -> Dict[str, Any]:
+        """Project a record down to the given (key, default) fields."""
+        return {k: record.get(k, d) for k, d in fields}
+
     def _simplify_page_state(self, page_state: Dict[str, Any]) -> Dict[str, Any]:
         """
         Simplify page state to reduce token usage while keeping essential info.
         """
+        pluck = self._pluck
         simplified = {
             "url": page_state.get("url", ""),
             "title": page_state.get("title", ""),
             "elements": {
-                "buttons": [],
-                "text_inputs": [],
-                "select_dropdowns": [],
-                "links": []
+                # Limit to the 20 most relevant buttons, 15 inputs, etc.
+                "buttons": [
+                    pluck(btn, self._BTN_FIELDS)
+                    for btn in page_state.get("buttons", [])[:20]
+                ],
+                "text_inputs": [
+                    pluck(inp, self._INPUT_FIELDS)
+                    for inp in page_state.get("text_inputs", [])[:15]
+                ],
+                "select_dropdowns": [
+                    # Options carry a transform (their own cap), so they
+                    # ride alongside the plucked fields
+                    {**pluck(dd, self._DROPDOWN_FIELDS),
+                     "options": dd.get("options", [])[:20]}
+                    for dd in page_state.get("select_dropdowns", [])[:10]
+                ],
+                # Only links with text are navigation-relevant
+                "links": [
+                    pluck(link, self._LINK_FIELDS)
+                    for link in page_state.get("links", [])[:15]
+                    if link.get("text")
+                ]
             }
         }
-        
-        # Simplify buttons - keep only essential fields
-        for btn in page_state.get("buttons", [])[:20]:  # Limit to 20 most relevant
-            simplified["elements"]["buttons"].append({
-                "text": btn.get("text", ""),
-                "id": btn.get("id"),
-                "aria_label": btn.get("aria_label"),
-                "selector": btn.get("selector"),
-                "is_enabled": btn.get("is_enabled", True),
-                "class": btn.get("class")
-            })
-        
-        # Simplify text inputs
-        for inp in page_state.get("text_inputs", [])[:15]:
-            simplified["elements"]["text_inputs"].append({
-                "type": inp.get("type", "text"),
-                "id": inp.get("id"),
-                "name": inp.get("name"),
-                "placeholder": inp.get("placeholder"),
-                "label": inp.get("label"),
-                "selector": inp.get("selector"),
-                "is_enabled": inp.get("is_enabled", True)
-            })
-        
-        # Simplify dropdowns
-        for dd in page_state.get("select_dropdowns", [])[:10]:
-            simplified["elements"]["select_dropdowns"].append({
-                "id": dd.get("id"),
-                "name": dd.get("name"),
-                "label": dd.get("label"),
-                "options": dd.get("options", [])[:20],  # Limit options
-                "selector": dd.get("selector"),
-                "current_value": dd.get("current_value")
-            })
-        
-        # Simplify links - focus on navigation-relevant ones
-        for link in page_state.get("links", [])[:15]:
-            if link.get("text"):  # Only include links with text
-                simplified["elements"]["links"].append({
-                    "text": link.get("text", ""),
-                    "href": link.get("href", ""),
-                    "selector": link.get("selector")
-                })
-        
+
+
         # Add visible text snippet for context
         visible_text = page_state.get("visible_text", "")
         if visible_text:
             simplified["visible_text_snippet"] = visible_text[:1000]
-        
+
         return simplified
     
     def _get_memory_summary(self) -> Dict[str, Any]:
-        """Get a summary of past actions."""
+        """Get a summary of past actions.
+
+        Each action is flattened to a short "<n>:<type>#<target>" string
+        rather than the raw dict: the full nested target/expect objects
+        were growing the prompt tail unpredictably, and the model only
+        needs to know what it already tried. Bounded size also keeps the
+        tail bytes stable for provider-side prefix caching.
+        """
+        start = max(0, len(self.memory) - 5)
+        recent = [
+            f"{i}:{entry.get('action', {}).get('type', '?')}"
+            f"#{str(entry.get('action', {}).get('target', {}).get('value', ''))[:24]}"
+            for i, entry in enumerate(self.memory[start:], start=start + 1)
+        ]
         return {
             "action_count": len(self.memory),
-            "recent_actions": self.memory[-5:] if self.memory else []
+            "recent_actions": recent
         }
     
     def _validate_plan(self, plan: Dict[str, Any]) -> None:
-        """Validate that the plan matches the required schema."""
+        """Validate that the plan matches the required schema.
+
+        Uses the precompiled validator when fastjsonschema is installed;
+        the manual checks below are the fallback.
+        """
+        if _PLAN_VALIDATOR is not None:
+            try:
+                _PLAN_VALIDATOR(plan)
+            except fastjsonschema.JsonSchemaException as e:
+                raise ValueError(f"Plan failed schema validation: {e}") from e
+            return
+
         if "decision" not in plan:
             raise ValueError("Plan missing 'decision' field")
         
@@ -326,29 +744,68 @@ Analyze the current page state and decide the next action. Output ONLY valid JSO
             if "stop_state" not in plan:
                 raise ValueError("decision='stop' requires 'stop_state'")
     
+    def invalidate_last_plan(self) -> None:
+        """Evict the caches behind the most recent plan() result.
+
+        The exact cache deliberately leaves memory out of its key, so a
+        plan that executed but moved nothing would otherwise be replayed
+        forever on the unchanged page. The loop calls this when it has
+        exhausted local retries of an action; the next plan() then misses
+        the caches and asks the model again with the updated memory.
+        """
+        if self._last_cache_key is not None:
+            self._plan_cache.pop(self._last_cache_key, None)
+            self._last_cache_key = None
+        if self._last_plan_text is not None:
+            self._semantic_cache = [
+                (vec, text) for vec, text in self._semantic_cache
+                if text != self._last_plan_text
+            ]
+            self._last_plan_text = None
+
     def clear_memory(self) -> None:
         """Clear the action memory."""
         self.memory = []
         logger.info("Memory cleared")
-    
+
     def get_memory(self) -> List[Dict[str, Any]]:
         """Get the full action memory."""
         return self.memory.copy()
-    
-    def save_memory(self, filepath: str = "planner_memory.json") -> None:
-        """Save memory to a JSON file."""
-        with open(filepath, 'w') as f:
-            json.dump(self.memory, f, indent=2)
-        logger.info(f"Memory saved to {filepath}")
-    
-    def load_memory(self, filepath: str = "planner_memory.json") -> None:
-        """Load memory from a JSON file."""
+
+    def append_memory(self, entry: Dict[str, Any]) -> None:
+        """Record one action in memory."""
+        self.memory.append(entry)
+
+    def save_memory(self, filepath: str = "planner_memory.jsonl") -> None:
+        """Append the newest memory entry to a JSONL file.
+
+        Append-only keeps each save O(1) instead of rewriting the whole
+        history; read the file back with load_memory.
+        """
+        if not self.memory:
+            return
+        with open(filepath, 'a') as f:
+            f.write(_dumps(self.memory[-1]) + "\n")
+        logger.info("Memory saved to %s", filepath)
+
+    def load_memory(self, filepath: str = "planner_memory.jsonl") -> None:
+        """Load memory from a JSONL file (one entry per line).
+
+        Files written by the old whole-list format (a JSON array) are
+        still read correctly.
+        """
         try:
             with open(filepath, 'r') as f:
-                self.memory = json.load(f)
-            logger.info(f"Memory loaded from {filepath}")
+                first = f.read(1)
+                f.seek(0)
+                if first == "[":
+                    # Legacy format: the full list as one pretty-printed array
+                    self.memory = json.load(f)
+                else:
+                    self.memory = [_loads(line) for line in f if line.strip()]
+            logger.info("Memory loaded from %s", filepath)
         except FileNotFoundError:
-            logger.warning(f"Memory file not found: {filepath}")
+            logger.warning("Memory file not found: %s", filepath)
 
 
 # Example usage